@@ -10,10 +10,14 @@ from .data_factory import (
 )
 from .db_pool import (
     DatabaseConnectionPool,
+    AsyncDatabaseConnectionPool,
     get_db_engine,
     get_db_connection,
     get_db_transaction,
-    get_pool_status
+    get_pool_status,
+    get_async_db_engine,
+    get_async_connection,
+    get_async_transaction
 )
 from .config import (
     LOG_CONFIG,
@@ -31,8 +35,10 @@ __all__ = [
     'BaseDataProcessor',
     'DataSourceConfig', 'BaseDataFactory', 'StockDataFactory', 
     'FundDataFactory', 'create_data_factory',
-    'DatabaseConnectionPool', 'get_db_engine', 'get_db_connection', 
+    'DatabaseConnectionPool', 'AsyncDatabaseConnectionPool',
+    'get_db_engine', 'get_db_connection',
     'get_db_transaction', 'get_pool_status',
+    'get_async_db_engine', 'get_async_connection', 'get_async_transaction',
     'LOG_CONFIG', 'DB_CONFIG', 'STOCK_CONFIG', 'FUND_CONFIG', 
     'RETRY_CONFIG', 'MARKET_CONFIGS', 'FUND_TYPES', 'get_config'
 ]
\ No newline at end of file
@@ -4,13 +4,86 @@
 提供统一的数据处理接口和通用功能
 """
 
+import functools
 import logging
+import queue
+import re
+import threading
 import time
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Set, Tuple, Optional, Any
 
 logger = logging.getLogger(__name__)
 
+# 异常类型名 -> 错误分类（优先于错误信息匹配）
+_ERROR_TYPE_MAP = {
+    'ChunkedEncodingError': 'CHUNKED_ENCODING',
+    'DatabaseError': 'DATABASE_ERROR',
+    'OperationalError': 'DATABASE_ERROR',
+}
+
+# 错误信息关键词统一编译为单个正则，一次扫描完成分类
+_ERROR_PATTERN = re.compile(
+    r"(?P<CHUNKED_ENCODING>chunked encoding)"
+    r"|(?P<TIMEOUT>timeout|timed out)"
+    r"|(?P<NETWORK>connection|network|unreachable)"
+    r"|(?P<RATE_LIMIT>rate limit|too many requests|429)"
+    r"|(?P<SERVER_ERROR>500|502|503|504|server error)"
+    r"|(?P<AUTH_ERROR>unauthorized|forbidden|401|403)"
+    r"|(?P<NOT_FOUND>not found|404)"
+    r"|(?P<NO_DATA>empty|no data)"
+    r"|(?P<DATA_FORMAT_ERROR>json|parse|decode|format)"
+    r"|(?P<DATABASE_ERROR>database)",
+    re.IGNORECASE
+)
+
+
+# 不重试的错误类型
+_NO_RETRY = frozenset({'AUTH_ERROR', 'NOT_FOUND', 'DATA_FORMAT_ERROR'})
+
+# 错误类型 -> 重试延迟计算函数，未命中则使用基础延迟
+_DELAY_FN = {
+    'RATE_LIMIT': lambda base, attempt: base * (2 ** attempt) + 5,  # 指数退避 + 额外延迟
+    'CHUNKED_ENCODING': lambda base, attempt: base + 2,             # 编码错误稍微延迟
+    'TIMEOUT': lambda base, attempt: base + attempt,                # 线性增加
+    'NETWORK': lambda base, attempt: base * attempt,                # 线性增长
+    'SERVER_ERROR': lambda base, attempt: base * 2,                 # 服务器错误延迟更久
+    'PANDAS_MISMATCH': lambda base, attempt: base * (attempt + 1),  # pandas错误增加等待时间
+}
+
+_DEFAULT_DELAY_FN = lambda base, attempt: base
+
+# 高频日志模板统一为模块常量，避免每次调用重建含emoji+中文的多字节字符串
+_MSGS = {
+    'fetch': "📥 正在获取 %s 数据...",
+    'ok': "✅ %s: 获取 %d 条记录",
+    'synced': "✅ %s: 同步 %d 条记录",
+    'fail_fetch': "%s 数据获取失败",
+    'fail_proc': "%s 数据处理失败",
+    'sources': "📋 配置了 %d 个数据源",
+    'sources_pipe': "📋 配置了 %d 个数据源（流水线模式）",
+    'partial_fail': "❌ %d/%d 个数据源失败: %s",
+    'no_data': "❌ 没有获取到任何有效数据",
+}
+
+# 默认分隔线预先算好，免去每次调用的字符串乘法
+_SEP_60 = "=" * 60
+
+
+@functools.lru_cache(maxsize=1024)
+def _classify_error_str(error_str: str) -> str:
+    """根据错误信息分类（纯函数，重复错误信息命中缓存）"""
+    # Pandas数据不匹配错误（基金模块特有，复合条件单独预检）
+    if "length mismatch" in error_str and "expected axis has 0 elements" in error_str:
+        return "PANDAS_MISMATCH"
+
+    match = _ERROR_PATTERN.search(error_str)
+    if match:
+        return match.lastgroup
+
+    return 'UNKNOWN'
+
 class BaseDataProcessor(ABC):
     """数据处理器抽象基类"""
     
@@ -24,14 +97,57 @@ class BaseDataProcessor(ABC):
         """获取数据源配置"""
         pass
     
-    @abstractmethod
-    def safe_get_data(self, get_func, source_name: str, **kwargs) -> Optional[Any]:
-        """安全获取数据"""
-        pass
+    def safe_get_data(self, get_func, source_name: str, max_retry: int = None,
+                      base_delay: int = None, **kwargs) -> Optional[Any]:
+        """安全获取数据（带错误分类重试）
+
+        成功路径只有一次调用和一次空值检查，分类/退避helpers仅在
+        异常发生后才执行。
+        """
+        from .config import DB_CONFIG
+
+        if get_func is None:
+            self.logger.warning("数据源 %s 的获取函数为空", source_name)
+            return None
+
+        if max_retry is None:
+            max_retry = DB_CONFIG["max_retry"]
+        if base_delay is None:
+            base_delay = DB_CONFIG["retry_delay"]
+
+        for attempt in range(max_retry):
+            try:
+                data = get_func(**kwargs)
+            except Exception as e:
+                error_type = self._classify_error(e)
+                self.logger.error("❌ [%s] 第 %d 次获取数据失败 [%s]: %s",
+                                  source_name, attempt + 1, error_type, e)
+                if not self._should_retry(error_type, attempt, max_retry):
+                    self.logger.error("💥 [%s] 错误类型 %s 不适合重试，直接失败", source_name, error_type)
+                    return None
+                if attempt < max_retry - 1:
+                    delay = self._get_retry_delay(error_type, base_delay, attempt)
+                    self.logger.info("⏳ [%s] %s 秒后重试...", source_name, delay)
+                    time.sleep(delay)
+                continue
+
+            if data is None or (hasattr(data, 'empty') and data.empty):
+                self.logger.warning("⚠️ [%s] 返回数据为空，第 %d 次重试", source_name, attempt + 1)
+                continue
+
+            return data
+
+        self.logger.error("💥 [%s] 拉取数据失败，超过最大重试次数", source_name)
+        return None
     
     @abstractmethod
-    def process_data(self, raw_data: Any, source_name: str) -> Optional[List[Tuple]]:
-        """处理数据"""
+    def process_data(self, raw_data: Any, source_name: str) -> Optional[Any]:
+        """处理数据
+
+        返回记录列表（List[Tuple]）或直接返回清洗后的DataFrame；
+        返回DataFrame时入库层可走copy_dataframe_to_table的COPY路径，
+        省去 DataFrame -> 元组 -> 参数绑定 的两层逐行转换。
+        """
         pass
     
     @abstractmethod
@@ -40,105 +156,62 @@ class BaseDataProcessor(ABC):
         pass
     
     def format_duration(self, duration_sec: float) -> str:
-        """格式化时间间隔"""
-        if duration_sec < 60:
-            return f"{duration_sec:.2f} 秒"
-        elif duration_sec < 3600:
-            minutes = int(duration_sec // 60)
-            seconds = duration_sec % 60
-            return f"{minutes} 分 {seconds:.2f} 秒"
-        else:
-            hours = int(duration_sec // 3600)
-            minutes = int((duration_sec % 3600) // 60)
-            seconds = duration_sec % 60
-            return f"{hours} 小时 {minutes} 分 {seconds:.2f} 秒"
+        """格式化时间间隔（一对divmod拆出时分秒，替代多次//和%）"""
+        hours, rem = divmod(duration_sec, 3600)
+        minutes, seconds = divmod(rem, 60)
+        if hours:
+            return f"{int(hours)} 小时 {int(minutes)} 分 {seconds:.2f} 秒"
+        if minutes:
+            return f"{int(minutes)} 分 {seconds:.2f} 秒"
+        return f"{seconds:.2f} 秒"
     
     def _classify_error(self, error: Exception) -> str:
         """错误分类"""
-        error_str = str(error).lower()
-        error_type = type(error).__name__
-        
-        # 编码相关错误（基金模块特有）
-        if "chunkedencodingerror" in error_type.lower() or "chunked encoding" in error_str:
-            return "CHUNKED_ENCODING"
-        
-        # 超时错误
-        if any(keyword in error_str for keyword in ['timeout', 'timed out']):
-            return 'TIMEOUT'
-        
-        # 网络连接错误
-        if any(keyword in error_str for keyword in ['connection', 'network', 'unreachable']):
-            return 'NETWORK'
-        
-        # API限制错误
-        if any(keyword in error_str for keyword in ['rate limit', 'too many requests', '429']):
-            return 'RATE_LIMIT'
-        
-        # 服务器错误
-        if any(keyword in error_str for keyword in ['500', '502', '503', '504', 'server error']):
-            return 'SERVER_ERROR'
-        
-        # 权限错误
-        if any(keyword in error_str for keyword in ['unauthorized', 'forbidden', '401', '403']):
-            return 'AUTH_ERROR'
-        
-        # 资源未找到错误
-        if any(keyword in error_str for keyword in ['not found', '404']):
-            return 'NOT_FOUND'
-        
-        # 数据为空错误
-        if any(keyword in error_str for keyword in ['empty', 'no data']):
-            return 'NO_DATA'
-        
-        # Pandas数据不匹配错误（基金模块特有）
-        if "length mismatch" in error_str and "expected axis has 0 elements" in error_str:
-            return "PANDAS_MISMATCH"
-        
-        # 数据格式错误
-        if any(keyword in error_str for keyword in ['json', 'parse', 'decode', 'format']):
-            return 'DATA_FORMAT_ERROR'
-        
-        # 数据库错误
-        if 'database' in error_str or error_type in ['DatabaseError', 'OperationalError']:
-            return 'DATABASE_ERROR'
-        
-        # 其他未知错误
-        return 'UNKNOWN'
+        # 先按异常类型精确匹配
+        mapped = _ERROR_TYPE_MAP.get(type(error).__name__)
+        if mapped is not None:
+            return mapped
+
+        return _classify_error_str(str(error).lower())
     
     def _should_retry(self, error_type: str, attempt: int, max_retry: int) -> bool:
-        """判断是否应该重试"""
-        if attempt >= max_retry:
-            return False
-        
-        # 不重试的错误类型
-        no_retry_errors = {'AUTH_ERROR', 'NOT_FOUND', 'DATA_FORMAT_ERROR'}
-        if error_type in no_retry_errors:
-            return False
-        
-        # 限制重试次数的错误类型
-        if error_type == 'RATE_LIMIT' and attempt >= 2:
-            return False
-        
-        return True
-    
+        """判断是否应该重试（RATE_LIMIT最多重试2次）"""
+        return (attempt < max_retry
+                and error_type not in _NO_RETRY
+                and not (error_type == 'RATE_LIMIT' and attempt >= 2))
+
     def _get_retry_delay(self, error_type: str, base_delay: int, attempt: int) -> int:
-        """获取重试延迟时间"""
-        # 根据错误类型调整延迟
-        if error_type == 'RATE_LIMIT':
-            return base_delay * (2 ** attempt) + 5  # 指数退避 + 额外延迟
-        elif error_type == 'CHUNKED_ENCODING':
-            return base_delay + 2  # 编码错误稍微延迟
-        elif error_type == 'TIMEOUT':
-            return base_delay + attempt  # 线性增加
-        elif error_type == 'NETWORK':
-            return base_delay * attempt  # 线性增长
-        elif error_type == 'SERVER_ERROR':
-            return base_delay * 2  # 服务器错误延迟更久
-        elif error_type == 'PANDAS_MISMATCH':
-            return base_delay * (attempt + 1)  # pandas错误增加等待时间
-        else:
-            return base_delay
+        """获取重试延迟时间（按错误类型查表计算）"""
+        return _DELAY_FN.get(error_type, _DEFAULT_DELAY_FN)(base_delay, attempt)
     
+    def copy_dataframe_to_table(self, engine, df, table: str, columns: Tuple[str, ...]) -> int:
+        """将DataFrame经CSV缓冲用COPY导入目标表
+
+        pandas的C层to_csv序列化远快于Python逐行迭代元组，配合
+        COPY FROM STDIN绕过SQL解析，是大表全量写入的最快路径。
+        """
+        import io
+
+        buf = io.StringIO()
+        df.to_csv(buf, index=False, header=False, columns=list(columns))
+        buf.seek(0)
+
+        raw_conn = engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {table}({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')",
+                    buf
+                )
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+
+        return len(df)
+
     def start_timing(self):
         """开始计时"""
         self.start_time = time.time()
@@ -153,9 +226,9 @@ class BaseDataProcessor(ABC):
         """记录性能日志"""
         if count is not None:
             rate = count / duration if duration > 0 else 0
-            self.logger.info(f"📊 {operation}: {count} 条记录, 耗时 {self.format_duration(duration)}, 速率 {rate:.1f} 条/秒")
+            self.logger.info("📊 %s: %d 条记录, 耗时 %s, 速率 %.1f 条/秒", operation, count, self.format_duration(duration), rate)
         else:
-            self.logger.info(f"📊 {operation}: 耗时 {self.format_duration(duration)}")
+            self.logger.info("📊 %s: 耗时 %s", operation, self.format_duration(duration))
     
     def log_section_start(self, title: str, level: str = "info"):
         """记录章节开始日志，避免重复分隔线"""
@@ -175,40 +248,60 @@ class BaseDataProcessor(ABC):
             separator = char * padding + f" {message} " + char * padding
             if len(separator) < length:
                 separator += char
+        elif char == "=" and length == 60:
+            separator = _SEP_60
         else:
             separator = char * length
         self.logger.info(separator)
     
+    def _fetch_and_process(self, source_name: str, api_func) -> Tuple[str, Optional[Any], Optional[str]]:
+        """获取并处理单个数据源，返回 (数据源名称, 处理结果, 错误信息)"""
+        self.logger.info(_MSGS['fetch'], source_name)
+        raw_data = self.safe_get_data(api_func, source_name)
+
+        if raw_data is None:
+            return source_name, None, _MSGS['fail_fetch'] % source_name
+
+        processed_data = self.process_data(raw_data, source_name)
+        # process_data可能返回DataFrame，不能做真值判断（会抛ambiguous）
+        if processed_data is None or len(processed_data) == 0:
+            return source_name, None, _MSGS['fail_proc'] % source_name
+
+        return source_name, processed_data, None
+
     def run(self) -> Dict[str, Any]:
         """运行数据处理流程"""
         self.start_timing()
-        
+
         try:
             # 1. 获取数据源配置
             data_sources = self.get_data_sources()
-            self.logger.info(f"📋 配置了 {len(data_sources)} 个数据源")
-            
-            # 2. 收集所有数据
+            self.logger.info(_MSGS['sources'], len(data_sources))
+
+            # 2. 并发收集所有数据（各数据源网络IO独立，失败互不影响）
             all_data = {}
-            for source_config in data_sources:
-                source_name = source_config['name']
-                api_func = source_config['api_func']
-                
-                self.logger.info(f"📥 正在获取 {source_name} 数据...")
-                raw_data = self.safe_get_data(api_func, source_name)
-                
-                if raw_data is not None:
-                    processed_data = self.process_data(raw_data, source_name)
-                    if processed_data:
-                        all_data[source_name] = processed_data
-                        self.logger.info(f"✅ {source_name}: 获取 {len(processed_data)} 条记录")
+            errors = []
+            max_workers = max(
+                len(data_sources),
+                max((s.get('concurrency', 1) for s in data_sources), default=1)
+            )
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(self._fetch_and_process, s['name'], s['api_func'])
+                    for s in data_sources
+                ]
+                for future in as_completed(futures):
+                    source_name, processed_data, error = future.result()
+                    if error is not None:
+                        self.logger.error("❌ %s", error)
+                        errors.append(error)
                     else:
-                        self.logger.error(f"❌ {source_name}: 数据处理失败")
-                        return {'success': False, 'error': f'{source_name} 数据处理失败'}
-                else:
-                    self.logger.error(f"❌ {source_name}: 数据获取失败")
-                    return {'success': False, 'error': f'{source_name} 数据获取失败'}
-            
+                        all_data[source_name] = processed_data
+                        self.logger.info(_MSGS['ok'], source_name, len(processed_data))
+
+            if errors:
+                self.logger.error(_MSGS['partial_fail'], len(errors), len(data_sources), errors)
+
             # 3. 同步到数据库
             if all_data:
                 sync_result = self.sync_to_database(all_data)
@@ -224,9 +317,118 @@ class BaseDataProcessor(ABC):
                     'sync_result': sync_result
                 }
             else:
-                self.logger.error("❌ 没有获取到任何有效数据")
+                self.logger.error(_MSGS['no_data'])
                 return {'success': False, 'error': '没有获取到任何有效数据'}
                 
         except Exception as e:
-            self.logger.error(f"❌ 数据处理流程异常: {e}", exc_info=True)
+            self.logger.error("❌ 数据处理流程异常: %s", e, exc_info=True)
+            return {'success': False, 'error': str(e)}
+
+    def run_pipelined(self) -> Dict[str, Any]:
+        """运行数据处理流程（三阶段流水线版本）
+
+        获取 -> 处理 -> 入库 三个阶段通过有界队列衔接：
+        第N个数据源入库的同时可以拉取第N+1个数据源，队列 maxsize=2
+        形成背压，内存占用保持有界。
+        """
+        self.start_timing()
+
+        try:
+            data_sources = self.get_data_sources()
+            self.logger.info(_MSGS['sources_pipe'], len(data_sources))
+
+            fetch_q = queue.Queue(maxsize=2)
+            write_q = queue.Queue(maxsize=2)
+            errors = []
+            sync_results = {}
+
+            # 各阶段异常只记入errors并继续传递哨兵：若任由线程带着
+            # 异常退出，下游会永远卡在get()上，上游又被有界队列的
+            # put()背压堵住，主线程join()就挂死了
+
+            def fetch_worker():
+                """获取阶段：拉取原始数据"""
+                try:
+                    for source_config in data_sources:
+                        source_name = source_config['name']
+                        self.logger.info(_MSGS['fetch'], source_name)
+                        raw_data = self.safe_get_data(source_config['api_func'], source_name)
+                        if raw_data is None:
+                            errors.append(_MSGS['fail_fetch'] % source_name)
+                        else:
+                            fetch_q.put((source_name, raw_data))
+                except Exception as e:
+                    self.logger.error("❌ 获取阶段异常: %s", e, exc_info=True)
+                    errors.append(f"获取阶段异常: {e}")
+                finally:
+                    fetch_q.put(None)  # 结束哨兵，异常时同样传递
+
+            def process_worker():
+                """处理阶段：清洗转换数据"""
+                try:
+                    while True:
+                        item = fetch_q.get()
+                        if item is None:
+                            break
+                        source_name, raw_data = item
+                        processed_data = self.process_data(raw_data, source_name)
+                        # 同_fetch_and_process：DataFrame不能做真值判断
+                        if processed_data is None or len(processed_data) == 0:
+                            errors.append(_MSGS['fail_proc'] % source_name)
+                        else:
+                            write_q.put((source_name, processed_data))
+                except Exception as e:
+                    self.logger.error("❌ 处理阶段异常: %s", e, exc_info=True)
+                    errors.append(f"处理阶段异常: {e}")
+                    # 继续消费上游直到哨兵，让fetch线程不被背压堵住
+                    while fetch_q.get() is not None:
+                        pass
+                finally:
+                    write_q.put(None)
+
+            def write_worker():
+                """入库阶段：按数据源增量同步"""
+                try:
+                    while True:
+                        item = write_q.get()
+                        if item is None:
+                            break
+                        source_name, processed_data = item
+                        sync_results[source_name] = self.sync_to_database({source_name: processed_data})
+                        self.logger.info(_MSGS['synced'], source_name, len(processed_data))
+                except Exception as e:
+                    self.logger.error("❌ 入库阶段异常: %s", e, exc_info=True)
+                    errors.append(f"入库阶段异常: {e}")
+                    # 同样清空上游队列直到哨兵
+                    while write_q.get() is not None:
+                        pass
+
+            workers = [
+                threading.Thread(target=fetch_worker, name='fetch', daemon=True),
+                threading.Thread(target=process_worker, name='process', daemon=True),
+                threading.Thread(target=write_worker, name='write', daemon=True),
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+            if errors:
+                self.logger.error(_MSGS['partial_fail'], len(errors), len(data_sources), errors)
+
+            if sync_results:
+                total_time = self.get_elapsed_time()
+                self.log_performance("总体处理", total_time)
+                return {
+                    'success': True,
+                    'processed_sources': len(sync_results),
+                    'total_time': total_time,
+                    'sync_result': sync_results
+                }
+            else:
+                self.logger.error(_MSGS['no_data'])
+                return {'success': False, 'error': '没有获取到任何有效数据'}
+
+        except Exception as e:
+            self.logger.error("❌ 数据处理流水线异常: %s", e, exc_info=True)
             return {'success': False, 'error': str(e)}
\ No newline at end of file
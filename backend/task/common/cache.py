@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+进程内TTL缓存
+用于缓存同步任务中重复执行的全表扫描结果（如现有编码集合）
+"""
+
+import logging
+import time
+from threading import Lock
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+class TTLCache:
+    """简单的线程安全TTL缓存"""
+
+    def __init__(self, ttl: int = 60):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = Lock()
+
+    def get(self, key) -> Optional[Any]:
+        """获取缓存值，过期返回None"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if time.time() > expires_at:
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl: int = None) -> None:
+        """设置缓存值"""
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+
+    def invalidate(self, key=None) -> None:
+        """失效指定键（不传键则清空全部）"""
+        with self._lock:
+            if key is None:
+                self._data.clear()
+            else:
+                self._data.pop(key, None)
+
+# 现有编码查询结果缓存：同一次同步运行内A股/港股/美股等多个数据源
+# 共享一次全表扫描结果，60秒后过期以便下次运行重新查询
+existing_codes_cache = TTLCache(ttl=60)
@@ -3,19 +3,23 @@
 统一配置管理
 """
 import os
+from functools import lru_cache
+from types import MappingProxyType
 
 # 环境配置
 ENVIRONMENT = os.environ.get('ENVIRONMENT', 'production')  # production, test, development
 
+# 环境 -> 表名改写规则（production使用原表名）
+_ENV_RENAMERS = {
+    'test': lambda base: base.replace('_info', '_test'),
+    'development': lambda base: f"{base}_dev",
+}
+
 # 表名配置函数
+@lru_cache(maxsize=None)
 def get_table_name(base_table: str) -> str:
     """根据环境获取表名"""
-    if ENVIRONMENT == 'test':
-        return f"{base_table.replace('_info', '_test')}"
-    elif ENVIRONMENT == 'development':
-        return f"{base_table}_dev"
-    else:
-        return base_table  # production环境使用原表名
+    return _ENV_RENAMERS.get(ENVIRONMENT, lambda base: base)(base_table)
 
 # 动态表名
 STOCK_TABLE = get_table_name('stock_info')
@@ -111,24 +115,26 @@ FUND_TYPES = {
     }
 }
 
+@lru_cache(maxsize=None)
 def get_config(module_type: str = 'default'):
-    """获取指定模块的配置"""
+    """获取指定模块的配置（结果缓存且只读，避免调用方误改共享配置）"""
     if module_type == 'stock':
-        return {
+        config = {
             'db_config': STOCK_CONFIG,
             'log_config': LOG_CONFIG,
             'retry_config': RETRY_CONFIG,
             'market_configs': MARKET_CONFIGS
         }
     elif module_type == 'fund':
-        return {
+        config = {
             'db_config': FUND_CONFIG,
             'log_config': LOG_CONFIG,
             'fund_types': FUND_TYPES
         }
     else:
-        return {
+        config = {
             'db_config': DB_CONFIG,
             'log_config': LOG_CONFIG,
             'retry_config': RETRY_CONFIG
-        }
\ No newline at end of file
+        }
+    return MappingProxyType(config)
\ No newline at end of file
@@ -12,8 +12,11 @@ logger = logging.getLogger(__name__)
 
 class DataSourceConfig:
     """数据源配置类"""
-    
-    def __init__(self, name: str, api_func: Callable, clean_func: Callable, 
+
+    __slots__ = ('name', 'api_func', 'clean_func', 'concurrency',
+                 'batch_size', 'extra_config', '_cached_dict')
+
+    def __init__(self, name: str, api_func: Callable, clean_func: Callable,
                  concurrency: int = 1, batch_size: int = 1000, **kwargs):
         self.name = name
         self.api_func = api_func
@@ -21,17 +24,20 @@ class DataSourceConfig:
         self.concurrency = concurrency
         self.batch_size = batch_size
         self.extra_config = kwargs
-    
+        self._cached_dict = None
+
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式"""
-        return {
-            'name': self.name,
-            'api_func': self.api_func,
-            'clean_func': self.clean_func,
-            'concurrency': self.concurrency,
-            'batch_size': self.batch_size,
-            **self.extra_config
-        }
+        """转换为字典格式（结果缓存，配置创建后不再变化）"""
+        if self._cached_dict is None:
+            self._cached_dict = {
+                'name': self.name,
+                'api_func': self.api_func,
+                'clean_func': self.clean_func,
+                'concurrency': self.concurrency,
+                'batch_size': self.batch_size,
+                **self.extra_config
+            }
+        return self._cached_dict
 
 class BaseDataFactory(ABC):
     """数据工厂抽象基类"""
@@ -59,12 +65,12 @@ class BaseDataFactory(ABC):
     def add_data_source(self, config: DataSourceConfig):
         """添加数据源配置"""
         self._data_sources[config.name] = config
-        self.logger.debug(f"注册数据源: {config.name}")
+        self.logger.debug("注册数据源: %s", config.name)
     
     def add_clean_function(self, name: str, func: Callable):
         """添加清洗函数"""
         self._clean_functions[name] = func
-        self.logger.debug(f"注册清洗函数: {name}")
+        self.logger.debug("注册清洗函数: %s", name)
     
     def get_data_source(self, name: str) -> Optional[DataSourceConfig]:
         """获取数据源配置"""
@@ -95,13 +101,13 @@ class BaseDataFactory(ABC):
         # 检查每个数据源是否有对应的清洗函数（允许清洗函数为None）
         for source_name, source_config in self._data_sources.items():
             if source_config.clean_func is None:
-                self.logger.debug(f"📝 数据源 {source_name} 的清洗函数为空，将在数据处理器中实现")
+                self.logger.debug("📝 数据源 %s 的清洗函数为空，将在数据处理器中实现", source_name)
             else:
                 clean_func_name = getattr(source_config.clean_func, '__name__', str(source_config.clean_func))
                 if clean_func_name not in self._clean_functions:
-                    self.logger.warning(f"⚠️ 数据源 {source_name} 的清洗函数 {clean_func_name} 未在工厂中注册")
+                    self.logger.warning("⚠️ 数据源 %s 的清洗函数 %s 未在工厂中注册", source_name, clean_func_name)
         
-        self.logger.info(f"✅ 配置验证通过: {len(self._data_sources)} 个数据源, {len(self._clean_functions)} 个清洗函数")
+        self.logger.info("✅ 配置验证通过: %s 个数据源, %s 个清洗函数", len(self._data_sources), len(self._clean_functions))
         return True
     
     def initialize(self) -> bool:
@@ -122,7 +128,7 @@ class BaseDataFactory(ABC):
                 return False
                 
         except Exception as e:
-            self.logger.error(f"❌ 数据工厂初始化异常: {e}", exc_info=True)
+            self.logger.error("❌ 数据工厂初始化异常: %s", e, exc_info=True)
             return False
     
     def create_processor_config(self) -> List[Dict[str, Any]]:
@@ -199,9 +205,9 @@ class FundDataFactory(BaseDataFactory):
             api_func=ak.fund_open_fund_daily_em,
             clean_func=None,
             concurrency=4,
-            batch_size=1000
+            batch_size=1000,
+            price_column_pattern="单位净值"
         )
-        config.price_column_pattern = "单位净值"
         self.add_data_source(config)
         
         # 注册货币基金数据源
@@ -210,9 +216,9 @@ class FundDataFactory(BaseDataFactory):
             api_func=ak.fund_money_fund_daily_em,
             clean_func=None,
             concurrency=1,
-            batch_size=1000
+            batch_size=1000,
+            price_column_pattern="万份收益"
         )
-        config.price_column_pattern = "万份收益"
         self.add_data_source(config)
         
         # 注册场内基金数据源
@@ -221,9 +227,9 @@ class FundDataFactory(BaseDataFactory):
             api_func=ak.fund_etf_fund_daily_em,
             clean_func=None,
             concurrency=1,
-            batch_size=1000
+            batch_size=1000,
+            price_column_pattern="单位净值"
         )
-        config.price_column_pattern = "单位净值"
         self.add_data_source(config)
         
         # 注册欧美QDII数据源
@@ -232,9 +238,9 @@ class FundDataFactory(BaseDataFactory):
             api_func=ak.qdii_e_index_jsl,
             clean_func=None,
             concurrency=1,
-            batch_size=1000
+            batch_size=1000,
+            price_column_pattern="现价"
         )
-        config.price_column_pattern = "现价"
         self.add_data_source(config)
         
         # 注册亚洲QDII数据源
@@ -243,9 +249,9 @@ class FundDataFactory(BaseDataFactory):
             api_func=ak.qdii_a_index_jsl,
             clean_func=None,
             concurrency=1,
-            batch_size=1000
+            batch_size=1000,
+            price_column_pattern="现价"
         )
-        config.price_column_pattern = "现价"
         self.add_data_source(config)
     
     def register_clean_functions(self):
@@ -276,8 +282,8 @@ def create_data_factory(factory_type: str) -> Optional[BaseDataFactory]:
         if factory.initialize():
             return factory
         else:
-            logger.error(f"❌ {factory_type} 数据工厂初始化失败")
+            logger.error("❌ %s 数据工厂初始化失败", factory_type)
             return None
     else:
-        logger.error(f"❌ 未知的工厂类型: {factory_type}")
+        logger.error("❌ 未知的工厂类型: %s", factory_type)
         return None
\ No newline at end of file
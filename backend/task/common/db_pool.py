@@ -8,12 +8,23 @@ import os
 import logging
 from sqlalchemy import create_engine
 from sqlalchemy.pool import QueuePool
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 from threading import Lock
-from .config import DB_CONFIG
+from .config import DB_CONFIG, FUND_CONFIG, MARKET_CONFIGS
 
 logger = logging.getLogger(__name__)
 
+def _default_pool_size() -> int:
+    """根据模块并发需求推算默认连接池大小
+
+    基金同步最多 FUND_CONFIG["max_workers"] 个并发连接，股票同步最多
+    各市场 concurrency 之和；取较大者再乘2留出余量，并保底10。
+    池过小会导致checkout排队（线程数超过池大小后吞吐不再增长），
+    过大则浪费数据库资源。
+    """
+    stock_concurrency = sum(m["concurrency"] for m in MARKET_CONFIGS.values())
+    return max(FUND_CONFIG["max_workers"], stock_concurrency, 5) * 2
+
 class DatabaseConnectionPool:
     """数据库连接池管理器"""
     
@@ -36,7 +47,46 @@ class DatabaseConnectionPool:
         self._initialized = True
         self._engine = None
         self._create_engine()
-    
+
+        # 预热由环境变量显式开启，避免测试环境产生连接副作用
+        if os.environ.get('PREWARM') == '1':
+            from threading import Thread
+            Thread(target=self._prewarm, name='db-prewarm', daemon=True).start()
+
+    def _prewarm(self, n: int = None):
+        """后台预热连接池并预取热点数据
+
+        SQLAlchemy连接池是惰性创建的，首个engine.connect()要付出
+        TCP+TLS+认证的握手延迟；这里提前建好一半连接并把现有股票/
+        基金代码查询结果灌入TTL缓存，把冷启动开销移出首批同步的
+        关键路径。
+        """
+        try:
+            if n is None:
+                n = max(self._engine.pool.size() // 2, 1)
+            conns = [self._engine.connect() for _ in range(n)]
+            for conn in conns:
+                conn.close()
+            logger.info(f"🔥 连接池预热完成: 预建 {n} 个连接")
+
+            from .cache import existing_codes_cache
+            from .sql_queries import StockSQL, FundSQL
+
+            with self.get_connection() as conn:
+                symbol_map = {}
+                for row in conn.execute(StockSQL.GET_EXISTING_SYMBOLS):
+                    symbol_map.setdefault(row[1], set()).add(row[0])
+                existing_codes_cache.set(('stock_info', 'L'), symbol_map)
+
+                res = conn.execute(FundSQL.GET_EXISTING_FUND_CODES)
+                codes = {row[0] for row in res.fetchall()}
+                existing_codes_cache.set(('fund_info', 'L'), codes)
+
+            logger.info("🔥 热点数据预取完成: 已缓存现有股票symbol与基金编码")
+        except Exception as e:
+            # 预热失败不影响正常流程，惰性路径仍然可用
+            logger.warning(f"⚠️ 连接池预热失败（不影响后续使用）: {e}")
+
     def _get_db_connection_string(self) -> str:
         """获取数据库连接字符串"""
         pg_host = os.environ.get('PG_HOST', 'localhost')
@@ -52,15 +102,15 @@ class DatabaseConnectionPool:
         try:
             connection_string = self._get_db_connection_string()
             
-            # 使用默认连接池配置
+            # 连接池参数可通过环境变量覆盖，默认按模块并发需求推算
             pool_config = {
-                'pool_size': 20,
-                'max_overflow': 10,
-                        'pool_pre_ping': True,
-                        'pool_recycle': 3600,
-                        'pool_timeout': 30,
-                        'echo': False
-                    }
+                'pool_size': int(os.environ.get('DB_POOL_SIZE', _default_pool_size())),
+                'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+                'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', '1') == '1',
+                'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 3600)),
+                'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+                'echo': False
+            }
             
             # 配置连接池参数
             self._engine = create_engine(
@@ -123,13 +173,17 @@ class DatabaseConnectionPool:
         """获取连接池状态信息"""
         if self._engine and hasattr(self._engine.pool, 'status'):
             pool = self._engine.pool
-            return {
+            status = {
                 'pool_size': pool.size(),
                 'checked_in': pool.checkedin(),
                 'checked_out': pool.checkedout(),
                 'overflow': pool.overflow(),
                 'invalid': pool.invalid()
             }
+            # 连接池接近耗尽时提前告警（checkout排队意味着并发数超过池容量）
+            if status['pool_size'] > 0 and status['checked_out'] / status['pool_size'] > 0.8:
+                logger.warning(f"⚠️ 连接池使用率过高: {status['checked_out']}/{status['pool_size']}，可能出现checkout排队")
+            return status
         return None
     
     def close_all_connections(self):
@@ -138,8 +192,106 @@ class DatabaseConnectionPool:
             self._engine.dispose()
             logger.info("🔒 数据库连接池已关闭")
 
+class AsyncDatabaseConnectionPool:
+    """异步数据库连接池管理器（asyncpg驱动）"""
+
+    _instance = None
+    _lock = Lock()
+
+    def __new__(cls):
+        """单例模式确保全局只有一个异步连接池"""
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        """初始化异步连接池"""
+        if hasattr(self, '_initialized'):
+            return
+
+        self._initialized = True
+        self._engine = None
+
+    def _get_db_connection_string(self) -> str:
+        """获取异步数据库连接字符串"""
+        pg_host = os.environ.get('PG_HOST', 'localhost')
+        pg_port = os.environ.get('PG_PORT', '5432')
+        pg_user = os.environ.get('PG_USER', 'postgres')
+        pg_password = os.environ.get('PG_PASSWORD', '')
+        pg_db = os.environ.get('PG_DB', 'postgres')
+
+        return f"postgresql+asyncpg://{pg_user}:{pg_password}@{pg_host}:{pg_port}/{pg_db}"
+
+    def _create_engine(self):
+        """创建异步数据库引擎和连接池"""
+        try:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            # 与同步连接池保持一致的池配置，pool_size对齐FUND_CONFIG["max_workers"]
+            self._engine = create_async_engine(
+                self._get_db_connection_string(),
+                pool_size=20,
+                max_overflow=10,
+                pool_pre_ping=True,
+                pool_recycle=3600,
+                pool_timeout=30,
+                echo=False
+            )
+
+            logger.info("✅ 异步数据库连接池初始化成功")
+
+        except Exception as e:
+            logger.error(f"❌ 异步数据库连接池初始化失败: {e}")
+            raise
+
+    def get_engine(self):
+        """获取异步数据库引擎（延迟创建）"""
+        if self._engine is None:
+            self._create_engine()
+        return self._engine
+
+    @asynccontextmanager
+    async def get_connection(self):
+        """获取异步数据库连接的上下文管理器"""
+        engine = self.get_engine()
+        async with engine.connect() as connection:
+            try:
+                yield connection
+            except Exception as e:
+                await connection.rollback()
+                logger.error(f"❌ 异步数据库连接操作失败: {e}")
+                raise
+
+    @asynccontextmanager
+    async def get_transaction(self):
+        """获取异步数据库事务的上下文管理器"""
+        engine = self.get_engine()
+        async with engine.connect() as connection:
+            try:
+                async with connection.begin():
+                    yield connection
+            except Exception as e:
+                logger.error(f"❌ 异步数据库事务操作失败: {e}")
+                raise
+
+    def get_pool_status(self):
+        """获取异步连接池状态信息"""
+        if self._engine is not None:
+            return self._engine.pool.status()
+        return None
+
+    async def close_all_connections(self):
+        """关闭所有异步连接"""
+        if self._engine:
+            await self._engine.dispose()
+            logger.info("🔒 异步数据库连接池已关闭")
+
+
 # 全局连接池实例
 db_pool = DatabaseConnectionPool()
+async_db_pool = AsyncDatabaseConnectionPool()
 
 # 便捷函数
 def get_db_engine():
@@ -156,4 +308,16 @@ def get_db_transaction():
 
 def get_pool_status():
     """获取连接池状态"""
-    return db_pool.get_pool_status()
\ No newline at end of file
+    return db_pool.get_pool_status()
+
+def get_async_db_engine():
+    """获取异步数据库引擎"""
+    return async_db_pool.get_engine()
+
+def get_async_connection():
+    """获取异步数据库连接上下文管理器"""
+    return async_db_pool.get_connection()
+
+def get_async_transaction():
+    """获取异步数据库事务上下文管理器"""
+    return async_db_pool.get_transaction()
\ No newline at end of file
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP会话管理模块
+为akshare等使用requests模块级调用的库提供带连接池的共享Session
+"""
+
+import logging
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+def create_pooled_session(pool_connections: int = 8, pool_maxsize: int = 16,
+                          retry=None) -> requests.Session:
+    """创建带连接池的requests会话
+
+    默认的requests模块级调用每次都新建TCP+TLS连接；挂载
+    HTTPAdapter后同一主机的请求复用keep-alive连接，省掉每次
+    请求的握手往返。
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize,
+        max_retries=retry if retry is not None else 0
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+@contextmanager
+def pooled_requests_session(pool_connections: int = 8, pool_maxsize: int = 16,
+                            retry=None):
+    """在上下文内把requests模块级get/post指向共享连接池会话
+
+    akshare内部使用requests.get/requests.post，这里临时替换为
+    Session的同名方法让所有接口调用走连接池，退出时恢复原函数
+    并关闭会话。
+    """
+    session = create_pooled_session(pool_connections, pool_maxsize, retry)
+    orig_get, orig_post = requests.get, requests.post
+    requests.get, requests.post = session.get, session.post
+    try:
+        logger.info(f"🔗 已启用共享HTTP连接池 (pool_connections={pool_connections}, pool_maxsize={pool_maxsize})")
+        yield session
+    finally:
+        requests.get, requests.post = orig_get, orig_post
+        session.close()
+        logger.info("🔗 共享HTTP连接池已关闭")
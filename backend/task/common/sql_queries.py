@@ -57,12 +57,13 @@ class StockSQL:
         )
     """)
     
-    # 标记股票为删除状态
-    MARK_STOCKS_DELETED = text("""
-        UPDATE stock_info 
-        SET status = 'D'
-        WHERE symbol = ANY(:symbols) AND market = :market
-    """)
+    # COPY批量导入使用的列顺序（临时表批量路径）
+    COPY_COLUMNS = (
+        "symbol", "cname", "name", "category", "category_id", "market", "status",
+        "price", "diff", "chg", "preclose", "open", "high", "low", "amplitude",
+        "volume", "turnover", "mktcap", "pe",
+        "best_bid_price", "best_ask_price", "datetime"
+    )
 
 # ============================================================================
 # 基金数据相关SQL
@@ -78,11 +79,15 @@ class FundSQL:
         WHERE status = 'L'
     """)
     
-    # 标记基金为删除状态
+    # 标记基金为删除状态（UNNEST展开后走hash join/索引查找，
+    # 大数组下计划比 = ANY(...) 更稳定；配套部分索引：
+    # CREATE INDEX IF NOT EXISTS idx_fund_info_code_status
+    #     ON fund_info(fund_code) WHERE status = 'L'）
     MARK_FUNDS_DELETED = text("""
-        UPDATE fund_info 
+        UPDATE fund_info
         SET status = 'D'
-        WHERE fund_code = ANY(:codes) AND status = 'L'
+        FROM unnest(CAST(:codes AS text[])) AS c(code)
+        WHERE fund_info.fund_code = c.code AND fund_info.status = 'L'
     """)
     
     # 批量插入基金
@@ -5,7 +5,10 @@
 """
 
 import logging
+import sys
 import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Set, Tuple, Optional, Any
 
 import akshare as ak
@@ -71,49 +74,7 @@ class FundDataProcessor(BaseDataProcessor):
             
         logger.info("=" * 60)
     
-    def safe_get_data(self, get_func, fund_name: str, max_retry=None) -> Optional:
-        """安全获取数据，带增强的重试机制和错误分类"""
-        if max_retry is None:
-            max_retry = DB_CONFIG["max_retry"]
-        
-        # 获取函数名称用于日志
-        func_name = get_func.__name__ if hasattr(get_func, '__name__') else str(get_func)
-        logger.info(f"[{fund_name}] 开始调用函数: {func_name}")
-            
-        for attempt in range(max_retry):
-            try:
-                logger.info(f"[{fund_name}] 第 {attempt+1} 次尝试调用 {func_name}")
-                df = get_func()
-                logger.info(f"[{fund_name}] {func_name} 调用成功，返回数据类型: {type(df)}")
-                
-                if df is not None and not df.empty:
-                    logger.info(f"[{fund_name}] {func_name} 返回数据行数: {len(df)}, 列数: {len(df.columns) if hasattr(df, 'columns') else 'N/A'}")
-                    return df
-                else:
-                    logger.warning(f"[{fund_name}] {func_name} 返回数据为空或None，第 {attempt+1} 次重试")
-            except Exception as e:
-                # 错误分类处理
-                error_type = self._classify_error(e)
-                logger.error(f"❌ [{fund_name}] 第 {attempt + 1} 次获取数据失败 [{error_type}]: {e}")
-                
-                # 根据错误类型决定是否重试
-                if not self._should_retry(error_type, attempt, max_retry):
-                    logger.error(f"💥 [{fund_name}] 错误类型 {error_type} 不适合重试，直接失败")
-                    return None
-                
-                if attempt < max_retry - 1:
-                    # 根据错误类型调整重试延迟
-                    adjusted_delay = self._get_retry_delay(error_type, DB_CONFIG["retry_delay"], attempt)
-                    logger.info(f"⏳ [{fund_name}] {adjusted_delay} 秒后重试...")
-                    time.sleep(adjusted_delay)
-                else:
-                    logger.error(f"💥 [{fund_name}] 所有重试均失败")
-                    return None
-        
-        logger.error(f"[{fund_name}] {func_name} 拉取数据失败，超过最大重试次数")
-        return None
-    
-    # 错误处理方法已移至基类 BaseDataProcessor
+    # safe_get_data 及错误处理方法已移至基类 BaseDataProcessor
     
     def get_price_column(self, fund_type: str, df_columns) -> Optional[str]:
         """根据基金类型获取价格列名"""
@@ -125,94 +86,95 @@ class FundDataProcessor(BaseDataProcessor):
         else:
             return next((c for c in df_columns if pattern in c), None)
     
-    def extract_fund_values(self, df, fund_type: str) -> List[Tuple]:
-        """提取基金数据"""
-        records = []
-        price_col = self.get_price_column(fund_type, df.columns)
-        
+    def extract_fund_values(self, df, fund_type: str, price_col: Optional[str] = None) -> List[Tuple]:
+        """提取基金数据（向量化列操作，替代iterrows逐行扫描）
+
+        price_col 可由调用方预先解析后传入，避免对同一DataFrame
+        重复做列名子串扫描。
+        """
+        if price_col is None:
+            price_col = self.get_price_column(fund_type, df.columns)
+
         if not price_col:
             logger.warning(f"[{fund_type}] 未找到价格列")
-            return records
-        
-        # 过滤价格不为空的数据
-        filtered_df = df[df[price_col].notna()]
-        logger.info(f"[{fund_type}] 价格不为空的数据条数: {len(filtered_df)}")
-        
-        for _, row in filtered_df.iterrows():
-            code = row.get("基金代码") or row.get("代码") or ""
-            name = row.get("基金简称") or row.get("名称") or ""
-            price = self.safe_float(row.get(price_col, None))
-            if code and name:  # 确保编码和名称不为空
-                records.append((code, name, fund_type, price))
-        
-        return records
-    
-    def safe_float(self, val) -> Optional[float]:
-        """安全转换为浮点数"""
-        try:
-            return float(val)
-        except Exception:
-            return None
+            return []
+
+        # 列级兜底：开放/货币基金用"基金代码/基金简称"，QDII用"代码/名称"
+        code_col = "基金代码" if "基金代码" in df.columns else "代码"
+        name_col = "基金简称" if "基金简称" in df.columns else "名称"
+        if code_col not in df.columns or name_col not in df.columns:
+            logger.warning(f"[{fund_type}] 未找到编码或名称列")
+            return []
+
+        # 整列一次C级解析，坏值置NaN后过滤
+        work = pd.DataFrame({
+            'code': df[code_col].fillna('').astype(str),
+            'name': df[name_col].fillna('').astype(str),
+            'price': pd.to_numeric(df[price_col], errors='coerce')
+        })
+        work = work.dropna(subset=['price'])
+        work = work[(work['code'] != '') & (work['name'] != '')]
+        logger.debug("[%s] 价格不为空的数据条数: %d", fund_type, len(work))
+
+        # fund_type驻留后N个元组共享同一字符串对象，下游集合成员
+        # 判断也省掉重复哈希计算
+        ft = sys.intern(fund_type)
+
+        # tolist()把numpy标量还原为Python原生类型，保证psycopg2可直接适配
+        return list(zip(work['code'].tolist(), work['name'].tolist(),
+                        [ft] * len(work), work['price'].tolist()))
     
+    def _collect_one_fund_type(self, fund_name: str, get_func) -> Tuple[str, Optional[List[Tuple]]]:
+        """获取并提取单个基金类型的数据，返回 (基金类型, 记录列表或None)"""
+        t0 = time.time()
+        df = self.safe_get_data(get_func, fund_name)
+
+        if df is None or df.empty:
+            logger.error(f"❌ [{fund_name}] 数据获取失败或为空")
+            return fund_name, None
+
+        # 提取已向量化为列级操作，无需再按5000行分块（分块只会增加
+        # DataFrame切片和日志开销，并不降低峰值内存）；
+        # 价格列在此处解析一次后传入
+        total_rows = len(df)
+        price_col = self.get_price_column(fund_name, df.columns)
+        records = self.extract_fund_values(df, fund_name, price_col)
+
+        # 清理DataFrame
+        del df
+
+        # 每个类型只留一条汇总日志（行数/有效记录数/耗时），
+        # 替代收集路径上零散的多条info
+        logger.info("✅ [%s] rows=%d records=%d dur=%.3fs", fund_name, total_rows, len(records), time.time() - t0)
+        return fund_name, records
+
     def collect_all_fund_data(self) -> Optional[Dict[str, List[Tuple]]]:
         """收集所有基金数据 - 必须全部成功才能继续"""
         fund_data = {}
         required_types = set(FUND_TYPES.keys())
         success_types = set()
         failed_types = []
-        
+
         logger.info("=" * 60)
         logger.info("🚀 开始收集基金数据")
         logger.info(f"📋 必须获取全部 {len(required_types)} 个类型: {list(required_types)}")
         logger.info("=" * 60)
-        
-        for fund_name, get_func, concurrency in self.fund_tasks:
-            logger.info(f"📥 正在获取: {fund_name}")
-            df = self.safe_get_data(get_func, fund_name)
-            
-            if df is None or df.empty:
-                logger.error(f"❌ [{fund_name}] 数据获取失败或为空")
-                failed_types.append(fund_name)
-                continue
-            
-            # 内存优化：分块处理大数据集
-            chunk_size = 5000  # 基金数据相对较小，使用5000条记录为一块
-            total_rows = len(df)
-            
-            if total_rows > chunk_size:
-                logger.info(f"📦 [{fund_name}] 大数据集检测，启用分块处理模式 (chunk_size={chunk_size})")
-                
-                all_records = []
-                # 分块处理
-                for i in range(0, total_rows, chunk_size):
-                    chunk_end = min(i + chunk_size, total_rows)
-                    chunk_df = df.iloc[i:chunk_end]
-                    
-                    logger.info(f"📦 [{fund_name}] 处理数据块 {i//chunk_size + 1}/{(total_rows-1)//chunk_size + 1} ({i+1}-{chunk_end})")
-                    
-                    chunk_records = self.extract_fund_values(chunk_df, fund_name)
-                    all_records.extend(chunk_records)
-                    
-                    # 清理临时变量
-                    del chunk_df, chunk_records
-                
-                records = all_records
-                del all_records
-            else:
-                # 小数据集直接处理
-                records = self.extract_fund_values(df, fund_name)
-            
-            # 清理DataFrame
-            del df
-            
-            if records:
-                fund_data[fund_name] = records
-                success_types.add(fund_name)
-                logger.info(f"✅ [{fund_name}] 成功获取 {len(records)} 条记录")
-            else:
-                logger.error(f"❌ [{fund_name}] 提取数据失败，无有效记录")
-                failed_types.append(fund_name)
-        
+
+        # 数据接口调用: 并发执行（网络IO为主，总耗时从各接口之和降为最慢一个）
+        with ThreadPoolExecutor(max_workers=max(len(self.fund_tasks), 1)) as executor:
+            futures = [
+                executor.submit(self._collect_one_fund_type, fund_name, get_func)
+                for fund_name, get_func, concurrency in self.fund_tasks
+            ]
+            for future in as_completed(futures):
+                fund_name, records = future.result()
+                if records:
+                    fund_data[fund_name] = records
+                    success_types.add(fund_name)
+                else:
+                    logger.error(f"❌ [{fund_name}] 提取数据失败，无有效记录")
+                    failed_types.append(fund_name)
+
         # 检查是否所有类型都成功获取
         logger.info("-" * 40)
         logger.info("📊 数据收集结果统计")
@@ -242,7 +204,6 @@ class FundDataProcessor(BaseDataProcessor):
         
         # 第一步：合并非QDII基金数据，并去除价格为空的数据
         domestic_funds = []
-        domestic_codes = set()
         domestic_type_counts = {}  # 统计各类型数量
         
         empty_price_codes = set()  # 收集价格为空的编码
@@ -252,21 +213,19 @@ class FundDataProcessor(BaseDataProcessor):
                 type_records = fund_data[fund_type]
                 logger.info(f"📊 {fund_type}: {len(type_records)} 条记录")
                 
-                type_count = 0
-                for record in type_records:
-                    code, name, _, price = record
-                    if price is not None:  # 只保留价格不为空的数据
-                        domestic_funds.append((code, name, fund_type, price))
-                        domestic_codes.add(code)
-                        type_count += 1
-                    else:
-                        empty_price_codes.add(code)
-                
-                domestic_type_counts[fund_type] = type_count
+                # 两趟C级推导替代逐行三次操作的Python循环
+                valid = [(code, name, fund_type, price)
+                         for code, name, _, price in type_records if price is not None]
+                domestic_funds.extend(valid)
+                empty_price_codes.update(code for code, _, _, price in type_records if price is None)
+                domestic_type_counts[fund_type] = len(valid)
                 
                 # 内存优化：清理已处理的数据
                 del fund_data[fund_type]
         
+        # 编码集合在合并完成后一次构建
+        domestic_codes = {f[0] for f in domestic_funds}
+        
         # 统一打印价格为空的编码集合
         if empty_price_codes:
             logger.info(f"🔄 排除价格为空的基金编码集合 ({len(empty_price_codes)} 个): {sorted(empty_price_codes)}")
@@ -291,6 +250,9 @@ class FundDataProcessor(BaseDataProcessor):
                 type_supplemented = 0
                 type_skipped = 0
                 
+                # 逐条明细降为debug：上万条QDII时每行info的格式化+锁
+                # 开销会主导整个函数耗时，INFO级别只保留聚合统计
+                per_item_debug = logger.isEnabledFor(logging.DEBUG)
                 for record in type_records:
                     code, name, _, price = record
                     if code not in domestic_codes:
@@ -299,12 +261,14 @@ class FundDataProcessor(BaseDataProcessor):
                         domestic_codes.add(code)
                         qdii_supplemented += 1
                         type_supplemented += 1
-                        logger.info(f"➕ 补充QDII基金: {code} ({name}) - {fund_type}")
+                        if per_item_debug:
+                            logger.debug("➕ 补充QDII基金: %s (%s) - %s", code, name, fund_type)
                     else:
                         # 编码已存在，跳过这条QDII基金
                         qdii_skipped += 1
                         type_skipped += 1
-                        logger.info(f"⏭️  跳过QDII基金: {code} ({name}) - {fund_type} (编码已存在)")
+                        if per_item_debug:
+                            logger.debug("⏭️  跳过QDII基金: %s (%s) - %s (编码已存在)", code, name, fund_type)
                 
                 qdii_type_counts[fund_type] = {
                     'supplemented': type_supplemented,
@@ -362,21 +326,21 @@ class FundDataProcessor(BaseDataProcessor):
         
         # 输出示例数据
         if new_codes:
-            logger.info(f"🆕 新增基金编码示例: {list(new_codes)[:5]}")
+            logger.info(f"🆕 新增基金编码示例: {list(islice(new_codes, 5))}")
             if len(new_codes) > 5:
                 logger.info(f"   ... 还有 {len(new_codes) - 5} 个编码")
         else:
             logger.info("✅ 无新增基金编码")
             
         if update_codes:
-            logger.info(f"🔄 更新基金编码示例: {list(update_codes)[:5]}")
+            logger.info(f"🔄 更新基金编码示例: {list(islice(update_codes, 5))}")
             if len(update_codes) > 5:
                 logger.info(f"   ... 还有 {len(update_codes) - 5} 个编码")
         else:
             logger.info("✅ 无需更新基金编码")
             
         if removed_codes:
-            logger.info(f"🗑️  需要删除的基金编码示例: {list(removed_codes)[:5]}")
+            logger.info(f"🗑️  需要删除的基金编码示例: {list(islice(removed_codes, 5))}")
             if len(removed_codes) > 5:
                 logger.info(f"   ... 还有 {len(removed_codes) - 5} 个编码")
         else:
@@ -4,17 +4,19 @@
 数据库操作模块
 """
 
+import csv
+import io
 import logging
 import time
 from datetime import datetime
 from typing import List, Set, Tuple
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from sqlalchemy import create_engine, text
 from psycopg2.extras import execute_values
 
 # 导入统一的SQL管理
 from common import FundSQL
+from common.cache import existing_codes_cache
 
 logger = logging.getLogger(__name__)
 
@@ -27,10 +29,26 @@ class FundDatabase:
         self.batch_size = batch_size
     
     def get_existing_fund_codes(self) -> Set[str]:
-        """获取数据库中现有的基金编码"""
-        with self.engine.connect() as conn:
-            res = conn.execute(FundSQL.GET_EXISTING_FUND_CODES)
-            return {row[0] for row in res.fetchall()}
+        """获取数据库中现有的基金编码（带TTL缓存，避免重复全表扫描）"""
+        cached = existing_codes_cache.get(('fund_info', 'L'))
+        if cached is not None:
+            logger.info(f"命中现有基金编码缓存: {len(cached)} 条")
+            return cached
+
+        # 命名游标走服务端流式读取，行直接进集合推导，
+        # 不再fetchall()一次性物化整个Row列表
+        raw_conn = self.engine.raw_connection()
+        try:
+            cursor = raw_conn.cursor(name='fund_codes_cur')
+            cursor.itersize = 10000
+            cursor.execute(str(FundSQL.GET_EXISTING_FUND_CODES))
+            codes = {row[0] for row in cursor}
+            cursor.close()
+        finally:
+            raw_conn.close()
+
+        existing_codes_cache.set(('fund_info', 'L'), codes)
+        return codes
     
     def mark_funds_deleted(self, fund_codes: Set[str]) -> float:
         """标记基金为删除状态"""
@@ -48,134 +66,240 @@ class FundDatabase:
         logger.info(f"标记删除完成，耗时: {duration:.4f} 秒")
         return duration
     
-    def _batch_insert_worker(self, batch_data: List[Tuple], worker_id: int) -> float:
-        """单个线程的批量插入操作 - 优化版本"""
+    def _batch_insert_worker(self, batches: List[List[Tuple]], worker_id: int) -> float:
+        """单个线程的批量插入操作 - 优化版本
+
+        一个线程处理分到它名下的全部批次，整个过程复用同一个连接，
+        避免每批次一次pool checkout（pool_pre_ping开启时还有一次
+        SELECT 1往返）。
+        """
         start_time = time.time()
-        
-        # 准备插入数据
-        insert_data = [
-            (code, name, fund_type, price, 'L') 
-            for code, name, fund_type, price in batch_data
-        ]
-        
+        total = 0
+
         try:
             with self.engine.connect() as conn:
-                with conn.begin():
-                    with conn.connection.cursor() as cursor:
-                        execute_values(cursor, FundSQL.INSERT_FUNDS_BATCH, insert_data, template="(%s,%s,%s,%s,%s)")
-            
+                for batch_data in batches:
+                    # 准备插入数据
+                    insert_data = [
+                        (code, name, fund_type, price, 'L')
+                        for code, name, fund_type, price in batch_data
+                    ]
+                    with conn.begin():
+                        # 批量写入路径关闭同步提交，减少每事务一次fsync的开销
+                        conn.execute(text("SET LOCAL synchronous_commit = off"))
+                        with conn.connection.cursor() as cursor:
+                            execute_values(cursor, FundSQL.INSERT_FUNDS_BATCH, insert_data,
+                                           template="(%s,%s,%s,%s,%s)", page_size=10000)
+                    total += len(batch_data)
+
             duration = time.time() - start_time
-            logger.info(f"[线程-{worker_id}] 批量插入 {len(batch_data)} 条记录，耗时: {duration:.4f} 秒")
+            logger.info(f"[线程-{worker_id}] 批量插入 {total} 条记录（{len(batches)} 批），耗时: {duration:.4f} 秒")
             return duration
         except Exception as e:
             logger.error(f"[线程-{worker_id}] 批量插入失败: {e}")
             raise
-    
-    def _batch_update_worker(self, batch_data: List[Tuple], worker_id: int) -> float:
-        """单个线程的批量更新操作 - 优化版本"""
+
+    def _batch_update_worker(self, batches: List[List[Tuple]], worker_id: int) -> float:
+        """单个线程的批量更新操作 - 优化版本
+
+        与插入路径一样，单连接贯穿该线程的全部批次。
+        """
         start_time = time.time()
-        
+        total = 0
+
         try:
             with self.engine.connect() as conn:
-                with conn.begin():
-                    with conn.connection.cursor() as cursor:
-                        # 准备批量更新数据
-                        update_data = [
-                            (code, name, price) 
-                            for code, name, _, price in batch_data
-                        ]
-                        
-                        # 使用execute_values执行批量更新
-                        execute_values(cursor, FundSQL.UPDATE_FUNDS_BATCH, update_data, template="(%s,%s,%s)")
-            
+                for batch_data in batches:
+                    with conn.begin():
+                        # 批量写入路径关闭同步提交，减少每事务一次fsync的开销
+                        conn.execute(text("SET LOCAL synchronous_commit = off"))
+                        with conn.connection.cursor() as cursor:
+                            # 准备批量更新数据
+                            update_data = [
+                                (code, name, price)
+                                for code, name, _, price in batch_data
+                            ]
+
+                            # 使用execute_values执行批量更新
+                            execute_values(cursor, FundSQL.UPDATE_FUNDS_BATCH, update_data,
+                                           template="(%s,%s,%s)", page_size=10000)
+                    total += len(batch_data)
+
             duration = time.time() - start_time
-            logger.info(f"[线程-{worker_id}] 批量更新 {len(batch_data)} 条记录，耗时: {duration:.4f} 秒")
+            logger.info(f"[线程-{worker_id}] 批量更新 {total} 条记录（{len(batches)} 批），耗时: {duration:.4f} 秒")
             return duration
         except Exception as e:
             logger.error(f"[线程-{worker_id}] 批量更新失败: {e}")
             raise
     
+    def _bulk_copy_insert(self, funds: List[Tuple]) -> float:
+        """COPY经临时表批量插入新基金（大批量/冷启动路径）
+
+        COPY FROM STDIN绕过SQL解析走批量协议，比多行INSERT快数倍；
+        先灌入临时表再一条 INSERT ... SELECT ... ON CONFLICT DO NOTHING
+        落库，与常规插入路径保持幂等语义。
+        """
+        start_time = time.time()
+        logger.info(f"开始COPY批量插入 {len(funds)} 个新基金")
+
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for code, name, fund_type, price in funds:
+            writer.writerow([code, name, fund_type, '' if price is None else price, 'L'])
+        buf.seek(0)
+
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TEMP TABLE fund_staging(
+                        fund_code text, fund_name text, fund_type text,
+                        latest_price numeric, status text
+                    ) ON COMMIT DROP
+                """)
+                cursor.copy_expert(
+                    "COPY fund_staging(fund_code, fund_name, fund_type, latest_price, status) "
+                    "FROM STDIN WITH (FORMAT csv, NULL '')",
+                    buf
+                )
+                cursor.execute("""
+                    INSERT INTO fund_info(fund_code, fund_name, fund_type, latest_price, status)
+                    SELECT fund_code, fund_name, fund_type, latest_price, status
+                    FROM fund_staging
+                    ON CONFLICT (fund_code) DO NOTHING
+                """)
+            raw_conn.commit()
+        except Exception as e:
+            raw_conn.rollback()
+            logger.error(f"COPY批量插入失败: {e}")
+            raise
+        finally:
+            raw_conn.close()
+
+        duration = time.time() - start_time
+        logger.info(f"COPY批量插入完成，共 {len(funds)} 条，耗时: {duration:.4f} 秒")
+        return duration
+
     def insert_new_funds(self, funds: List[Tuple]) -> float:
-        """多线程批量插入新基金"""
+        """批量插入新基金（单连接execute_values批量）"""
         if not funds:
             return 0.0
-            
+
+        # 大批量走COPY路径（首次全量/大量新增时收益最明显）
+        if len(funds) >= self.batch_size * 10:
+            return self._bulk_copy_insert(funds)
+
         start_time = time.time()
-        logger.info(f"开始多线程插入 {len(funds)} 个新基金，线程数: {self.max_workers}")
-        
-        # 分批处理
-        batches = [funds[i:i + self.batch_size] for i in range(0, len(funds), self.batch_size)]
-        logger.info(f"数据分为 {len(batches)} 个批次，每批最大 {self.batch_size} 条")
-        
-        total_duration = 0.0
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交所有批次任务
-            future_to_batch = {
-                executor.submit(self._batch_insert_worker, batch, i): i 
-                for i, batch in enumerate(batches)
-            }
-            
-            # 等待所有任务完成
-            for future in as_completed(future_to_batch):
-                batch_id = future_to_batch[future]
-                try:
-                    duration = future.result()
-                    total_duration += duration
-                except Exception as e:
-                    logger.error(f"批次 {batch_id} 执行失败: {e}")
-                    raise
-        
+        logger.info(f"开始批量插入 {len(funds)} 个新基金（单连接批量）")
+
+        # 写入吞吐受限于服务端WAL而非客户端线程数，execute_values已经
+        # 每语句万行批量，多连接并发只增加连接开销；分批仅为限制单批
+        # 内存占用
+        batches = [funds[i:i + 10000] for i in range(0, len(funds), 10000)]
+        total_duration = self._batch_insert_worker(batches, 0)
+
         duration = time.time() - start_time
-        logger.info(f"多线程插入完成，总耗时: {duration:.4f} 秒，实际插入耗时: {total_duration:.4f} 秒")
+        logger.info(f"批量插入完成，总耗时: {duration:.4f} 秒，实际插入耗时: {total_duration:.4f} 秒")
         return duration
     
     def update_existing_funds(self, funds: List[Tuple]) -> float:
-        """多线程批量更新现有基金"""
+        """批量更新现有基金（单连接execute_values批量）"""
         if not funds:
             return 0.0
             
         start_time = time.time()
-        logger.info(f"开始多线程更新 {len(funds)} 个现有基金，线程数: {self.max_workers}")
-        
-        # 分批处理
-        batches = [funds[i:i + self.batch_size] for i in range(0, len(funds), self.batch_size)]
-        logger.info(f"数据分为 {len(batches)} 个批次，每批最大 {self.batch_size} 条")
-        
-        total_duration = 0.0
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交所有批次任务
-            future_to_batch = {
-                executor.submit(self._batch_update_worker, batch, i): i 
-                for i, batch in enumerate(batches)
-            }
-            
-            # 等待所有任务完成
-            for future in as_completed(future_to_batch):
-                batch_id = future_to_batch[future]
-                try:
-                    duration = future.result()
-                    total_duration += duration
-                except Exception as e:
-                    logger.error(f"批次 {batch_id} 执行失败: {e}")
-                    raise
-        
+        logger.info(f"开始批量更新 {len(funds)} 个现有基金（单连接批量）")
+
+        # 同插入路径：单连接+万行execute_values页，分批仅为内存有界
+        batches = [funds[i:i + 10000] for i in range(0, len(funds), 10000)]
+        total_duration = self._batch_update_worker(batches, 0)
+
         duration = time.time() - start_time
-        logger.info(f"多线程更新完成，总耗时: {duration:.4f} 秒，实际更新耗时: {total_duration:.4f} 秒")
+        logger.info(f"批量更新完成，总耗时: {duration:.4f} 秒，实际更新耗时: {total_duration:.4f} 秒")
         return duration
     
+    def execute_merge_sync(self, final_funds: List[Tuple]) -> float:
+        """单事务服务端合并同步（替代三轮批量SQL的合并路径）
+
+        全量数据COPY进临时表后，用一条upsert加一条反向标记删除在
+        服务端完成新增/更新/删除，省掉Python侧的三个集合差集计算
+        和三轮线程池批量调度。
+        """
+        start_time = time.time()
+        logger.info(f"开始合并同步 {len(final_funds)} 个基金（COPY + upsert + 反向删除）")
+
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for code, name, fund_type, price in final_funds:
+            writer.writerow([code, name, fund_type, '' if price is None else price])
+        buf.seek(0)
+
+        raw_conn = self.engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                cursor.execute("""
+                    CREATE TEMP TABLE fund_stage(
+                        fund_code text, fund_name text, fund_type text,
+                        latest_price numeric
+                    ) ON COMMIT DROP
+                """)
+                cursor.copy_expert(
+                    "COPY fund_stage(fund_code, fund_name, fund_type, latest_price) "
+                    "FROM STDIN WITH (FORMAT csv, NULL '')",
+                    buf
+                )
+                # 新增 + 更新一条语句完成
+                cursor.execute("""
+                    INSERT INTO fund_info(fund_code, fund_name, fund_type, latest_price, status)
+                    SELECT fund_code, fund_name, fund_type, latest_price, 'L'
+                    FROM fund_stage
+                    ON CONFLICT (fund_code) DO UPDATE SET
+                        fund_name = EXCLUDED.fund_name,
+                        latest_price = EXCLUDED.latest_price,
+                        status = 'L'
+                """)
+                upserted = cursor.rowcount
+                # 不在本次全量集合中的存量基金标记删除
+                cursor.execute("""
+                    UPDATE fund_info
+                    SET status = 'D'
+                    WHERE status = 'L'
+                      AND NOT EXISTS (
+                          SELECT 1 FROM fund_stage
+                          WHERE fund_stage.fund_code = fund_info.fund_code
+                      )
+                """)
+                marked = cursor.rowcount
+            raw_conn.commit()
+        except Exception as e:
+            raw_conn.rollback()
+            logger.error(f"合并同步失败: {e}")
+            raise
+        finally:
+            raw_conn.close()
+
+        duration = time.time() - start_time
+        # rowcount即服务端的新增+更新/标记删除条数，替代原先Python侧的差异统计
+        logger.info(f"合并同步完成：写入/更新 {upserted} 条，标记删除 {marked} 条，耗时: {duration:.4f} 秒")
+        return duration
+
     def execute_batch_updates(self, final_funds: List[Tuple], new_codes: Set[str], removed_codes: Set[str], update_codes: Set[str]) -> float:
         """执行批量数据库更新操作"""
         start_time = time.time()
         
         # 1. 标记删除
         self.mark_funds_deleted(removed_codes)
-        
-        # 2. 插入新基金
-        new_funds = [f for f in final_funds if f[0] in new_codes]
+
+        # 2/3. 一次遍历按编码归属分流到插入/更新两个列表，
+        # 避免对final_funds做两轮完整扫描和两倍哈希查找
+        new_funds, update_funds = [], []
+        for fund in final_funds:
+            (new_funds if fund[0] in new_codes else update_funds).append(fund)
+
+        # 插入新基金
         self.insert_new_funds(new_funds)
-        
-        # 3. 更新现有基金
-        update_funds = [f for f in final_funds if f[0] in update_codes]
+
+        # 更新现有基金
         self.update_existing_funds(update_funds)
         
         total_duration = time.time() - start_time
@@ -4,9 +4,11 @@ import time
 
 import akshare as ak
 from sqlalchemy import create_engine, text
+from urllib3.util import Retry
 
 # 导入连接池管理器
 from common.db_pool import get_db_engine, get_db_connection, get_db_transaction
+from common.http_session import pooled_requests_session
 
 from .data_processor import FundDataProcessor
 from .db_operations import FundDatabase
@@ -70,8 +72,19 @@ def sync_task_runner():
     logger.info(f"   - 重试延迟: {DB_CONFIG['retry_delay']} 秒")
     logger.info("开始基金数据同步任务")
     
-    # 第一步：收集所有基金数据
-    fund_data = processor.collect_all_fund_data()
+    # 第一步：收集所有基金数据（akshare接口统一走共享连接池会话）
+    # HTTP状态类错误在传输层按指数退避重试（backoff_factor * 2**(n-1)），
+    # 异常不跨出adapter就不会重走akshare的DataFrame解析路径；
+    # safe_get_data 的Python层重试保留，兜底解析类/pandas类错误
+    http_retry = Retry(
+        total=DB_CONFIG["max_retry"],
+        backoff_factor=DB_CONFIG["retry_delay"],
+        status_forcelist=[403, 408, 429, 500, 502, 503, 504],
+        allowed_methods=["GET", "POST"],
+        respect_retry_after_header=True
+    )
+    with pooled_requests_session(retry=http_retry):
+        fund_data = processor.collect_all_fund_data()
     if not fund_data:
         logger.error("❌ 基金数据获取不完整，任务终止，不会与数据库交互")
         logger.error("请检查网络连接和API接口状态，确保所有五个数据源都能正常访问")
@@ -82,13 +95,10 @@ def sync_task_runner():
     # 第二步：整合基金数据，处理重复编码
     final_funds, _ = processor.integrate_fund_data(fund_data)
     
-    # 第三步：获取数据库现有数据并分析差异
-    existing_codes = db.get_existing_fund_codes()
-    new_codes, removed_codes, update_codes = processor.analyze_data_differences(final_funds, existing_codes)
-    
-    # 第四步：执行数据库更新操作
-    logger.info("开始执行数据库更新操作...")
-    db.execute_batch_updates(final_funds, new_codes, removed_codes, update_codes)
+    # 第三步：单事务合并同步（COPY + upsert + 反向标记删除），
+    # 差异计算在服务端完成，不再拉取全量现有编码做Python侧差集
+    logger.info("开始执行数据库合并同步...")
+    db.execute_merge_sync(final_funds)
     
     total_time = time.time() - start_time
     logger.info(f"基金数据同步任务完成，总耗时: {total_time:.4f} 秒")
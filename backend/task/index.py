@@ -1,8 +1,6 @@
 import logging
 import time
 from datetime import datetime
-from fundsync import sync_task_runner as fundsync_runner
-from stocksync import sync_task_runner as stocksync_runner
 from common.config import LOG_CONFIG
 
 # 配置日志
@@ -18,6 +16,9 @@ def run_fundsync_task():
     logger.info("🎯 开始执行基金数据同步任务")
     
     try:
+        # 延迟导入：fundsync会连带加载akshare（秒级扫描开销），
+        # 推迟到真正执行任务时再付出，缩短Lambda冷启动
+        from fundsync import sync_task_runner as fundsync_runner
         result = fundsync_runner()
         if result:
             logger.info("✅ 基金数据同步任务完成")
@@ -36,6 +37,8 @@ def run_stocksync_task():
     logger.info("🎯 开始执行股票数据同步任务")
     
     try:
+        # 同上，推迟akshare的导入开销
+        from stocksync import sync_task_runner as stocksync_runner
         result = stocksync_runner()
         if result:
             logger.info("✅ 股票数据同步任务完成")
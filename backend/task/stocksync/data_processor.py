@@ -6,13 +6,18 @@
 
 import logging
 import os
+import random
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
 from typing import Dict, List, Set, Tuple, Optional, Any
 
 import akshare as ak
 import pandas as pd
 from sqlalchemy import create_engine
 
+# 导入统一的SQL管理
+from common import StockSQL
+
 # 导入抽象基类和工厂模式
 from common.base_processor import BaseDataProcessor
 from common.data_factory import create_data_factory, StockDataFactory
@@ -39,44 +44,66 @@ from common.config import STOCK_CONFIG as DB_CONFIG, RETRY_CONFIG
 
 logger = logging.getLogger(__name__)
 
+# Copy-on-Write下切片共享底层缓冲直到写入才复制，省掉防御性拷贝，
+# 也让手动del失去意义（pandas 3.0起为默认行为）
+pd.set_option("mode.copy_on_write", True)
+
 class StockDataProcessor(BaseDataProcessor):
     """股票数据处理器"""
-    
+
+    # 进程级缓存：FaaS热容器反复构造处理器时，工厂与市场配置只在
+    # 首次真正构建，后续实例直接复用，初始化横幅日志也只打一次
+    _factory_cache = None
+    _market_configs_cache = None
+
     def __init__(self):
         """初始化股票数据处理器"""
         super().__init__()
-        
-        self.log_section_start("🔧 开始初始化股票数据处理器")
-        
-        # 初始化数据工厂（必须成功）
-        try:
-            self.data_factory = create_data_factory("stock")
-            if not self.data_factory:
-                raise RuntimeError("数据工厂创建失败")
-            logger.info("✅ 数据工厂初始化成功")
-        except Exception as e:
-            logger.error(f"❌ 数据工厂初始化失败: {e}")
-            raise RuntimeError(f"数据工厂初始化失败: {e}")
-        
+
+        cls = StockDataProcessor
+        first_init = cls._factory_cache is None
+
+        if first_init:
+            self.log_section_start("🔧 开始初始化股票数据处理器")
+
+            # 初始化数据工厂（必须成功）
+            try:
+                cls._factory_cache = create_data_factory("stock")
+                if not cls._factory_cache:
+                    raise RuntimeError("数据工厂创建失败")
+                logger.info("✅ 数据工厂初始化成功")
+            except Exception as e:
+                cls._factory_cache = None
+                logger.error(f"❌ 数据工厂初始化失败: {e}")
+                raise RuntimeError(f"数据工厂初始化失败: {e}")
+
+        self.data_factory = cls._factory_cache
+
         # 使用工厂模式配置
-        self.market_configs = self._create_market_configs_from_factory()
-        logger.info("✅ 使用工厂模式配置")
-        
-        logger.info("-" * 40)
-        logger.info(f"🎯 股票数据处理器初始化完成")
-        logger.info(f"📊 成功配置: {len(self.market_configs)} 个市场")
-        
-        if self.market_configs:
-            logger.info("✅ 已配置的市场:")
-            for config in self.market_configs:
-                market_name = config["market_name"]
-                func_name = config["get_data_func"].__name__
-                concurrency = config["concurrency"]
-                logger.info(f"   - {market_name}: {func_name} (并发数: {concurrency})")
-        else:
-            logger.error("❌ 没有成功配置任何市场！")
-            
-        self.log_section_end("股票数据处理器初始化完成")
+        if cls._market_configs_cache is None:
+            cls._market_configs_cache = self._create_market_configs_from_factory()
+        self.market_configs = cls._market_configs_cache
+        # 按市场名建索引，市场名键的查找走dict而非线性扫描
+        self._configs_by_name = {c["market_name"]: c for c in self.market_configs}
+        self._clean_funcs = {c["market_name"]: c["clean_func"] for c in self.market_configs}
+
+        if first_init:
+            logger.info("✅ 使用工厂模式配置")
+            logger.info("-" * 40)
+            logger.info(f"🎯 股票数据处理器初始化完成")
+            logger.info(f"📊 成功配置: {len(self.market_configs)} 个市场")
+
+            if self.market_configs:
+                logger.info("✅ 已配置的市场:")
+                for config in self.market_configs:
+                    market_name = config["market_name"]
+                    func_name = config["get_data_func"].__name__
+                    concurrency = config["concurrency"]
+                    logger.info(f"   - {market_name}: {func_name} (并发数: {concurrency})")
+            else:
+                logger.error("❌ 没有成功配置任何市场！")
+
+            self.log_section_end("股票数据处理器初始化完成")
     
     def _create_market_configs_from_factory(self) -> List[Dict[str, Any]]:
         """从工厂创建市场配置"""
@@ -105,36 +132,14 @@ class StockDataProcessor(BaseDataProcessor):
         """获取数据源配置"""
         return self.market_configs
     
-    def safe_get_data(self, get_func, source_name: str, **kwargs) -> Optional[Any]:
-        """安全获取数据"""
-        try:
-            if get_func is None:
-                logger.warning(f"数据源 {source_name} 的获取函数为空")
-                return None
-                
-            # 调用数据获取函数
-            data = get_func(**kwargs)
-            
-            if data is None or (hasattr(data, 'empty') and data.empty):
-                logger.warning(f"数据源 {source_name} 返回空数据")
-                return None
-                
-            logger.info(f"成功获取 {source_name} 数据，记录数: {len(data) if hasattr(data, '__len__') else '未知'}")
-            return data
-            
-        except Exception as e:
-            logger.error(f"获取 {source_name} 数据失败: {str(e)}")
-            return None
-    
+    # safe_get_data 已收敛到基类 BaseDataProcessor 的重试状态机
+
     def process_data(self, data: pd.DataFrame, market_name: str) -> pd.DataFrame:
         """处理数据"""
-        # 找到对应市场的清洗函数
-        for config in self.market_configs:
-            if config["market_name"] == market_name:
-                clean_func = config["clean_func"]
-                return clean_func(data)
-        
-        raise ValueError(f"未找到市场 {market_name} 的清洗函数")
+        clean_func = self._clean_funcs.get(market_name)
+        if clean_func is None:
+            raise ValueError(f"未找到市场 {market_name} 的清洗函数")
+        return clean_func(data)
     
     def sync_to_database(self, data: pd.DataFrame, market_name: str, db_connection) -> Dict[str, Any]:
         """同步数据到数据库"""
@@ -151,26 +156,23 @@ class StockDataProcessor(BaseDataProcessor):
         for attempt in range(max_retry):
             try:
                 logger.info(f"🔄 [{market_name}] 第 {attempt + 1}/{max_retry} 次尝试获取数据")
-                
-                # 设置超时
-                import signal
-                signal.alarm(timeout)
-                
-                data = get_data_func()
-                
-                # 取消超时
-                signal.alarm(0)
-                
+
+                # 单工作线程future带超时；signal.alarm只对主线程生效，
+                # 在线程化流水线里既不可靠又会相互覆盖
+                with ThreadPoolExecutor(max_workers=1) as fetch_pool:
+                    try:
+                        data = fetch_pool.submit(get_data_func).result(timeout=timeout)
+                    except FutureTimeoutError:
+                        raise TimeoutError(f"获取数据超时（{timeout} 秒）")
+
                 # 数据验证
                 if data is None or len(data) == 0:
                     raise ValueError(f"获取到空数据或无效数据")
-                
+
                 logger.info(f"✅ [{market_name}] 数据获取成功，共 {len(data)} 条记录")
                 return data
-                
+
             except Exception as e:
-                signal.alarm(0)  # 确保取消超时
-                
                 # 错误分类处理
                 error_type = self._classify_error(e)
                 logger.error(f"❌ [{market_name}] 第 {attempt + 1} 次获取数据失败 [{error_type}]: {e}")
@@ -181,9 +183,10 @@ class StockDataProcessor(BaseDataProcessor):
                     return None
                 
                 if attempt < max_retry - 1:
-                    # 根据错误类型调整重试延迟
-                    adjusted_delay = self._get_retry_delay(error_type, retry_delay, attempt)
-                    logger.info(f"⏳ [{market_name}] {adjusted_delay} 秒后重试...")
+                    # 指数退避封顶60秒，乘随机抖动打散各市场失败后的
+                    # 同步重试，避免对上游形成请求风暴
+                    adjusted_delay = min(retry_delay * (1 << attempt), 60) * random.uniform(0.5, 1.0)
+                    logger.info(f"⏳ [{market_name}] {adjusted_delay:.1f} 秒后重试...")
                     time.sleep(adjusted_delay)
                 else:
                     logger.error(f"💥 [{market_name}] 所有重试均失败，放弃获取数据")
@@ -192,7 +195,32 @@ class StockDataProcessor(BaseDataProcessor):
     
     # 错误处理方法已移至基类 BaseDataProcessor
     
-    def format_duration(self, duration_sec: float) -> str:
+    @staticmethod
+    def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+        """收窄DataFrame列类型以降低内存占用
+
+        低基数字符串列转category（后续掩码/去重按码值哈希而非字符串），
+        行情数值列downcast到float32/int32；展示精度下float32足够，
+        turnover/mktcap量级大，保留float64避免精度损失。
+        """
+        for col in ("market", "status"):
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+
+        float_cols = ("price", "diff", "chg", "best_bid_price", "best_ask_price",
+                      "preclose", "open", "high", "low", "amplitude", "pe")
+        for col in float_cols:
+            if col in df.columns and pd.api.types.is_float_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], downcast="float")
+
+        for col in ("volume", "category_id"):
+            if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+                df[col] = pd.to_numeric(df[col], downcast="integer")
+
+        return df
+
+    @staticmethod
+    def format_duration(duration_sec: float) -> str:
         """格式化时间显示"""
         if duration_sec >= 120:
             return f"{duration_sec / 60:.4f} 分钟"
@@ -228,59 +256,47 @@ class StockDataProcessor(BaseDataProcessor):
         
         # 清洗数据
         cleaned_dataframe = clean_func(raw_dataframe)
-        cleaned_dataframe = cleaned_dataframe.dropna(subset=["symbol", "datetime"])
-        logger.info(f"🧹 [{market_name}] 清洗后数据行数: {len(cleaned_dataframe)}")
-        
-        # 内存优化：释放原始数据
-        del raw_dataframe
-        
-        # 内存优化：分块处理大数据集
-        chunk_size = 10000  # 每次处理10000条记录
-        total_rows = len(cleaned_dataframe)
-        
-        if total_rows > chunk_size:
-            logger.info(f"📦 [{market_name}] 大数据集检测，启用分块处理模式 (chunk_size={chunk_size})")
-            
-            exist_records = []
-            new_records = []
-            new_symbols = set()
-            
-            # 分块处理
-            for i in range(0, total_rows, chunk_size):
-                chunk_end = min(i + chunk_size, total_rows)
-                chunk_df = cleaned_dataframe.iloc[i:chunk_end]
-                
-                logger.info(f"📦 [{market_name}] 处理数据块 {i//chunk_size + 1}/{(total_rows-1)//chunk_size + 1} ({i+1}-{chunk_end})")
-                
-                chunk_records = chunk_df.to_dict(orient="records")
-                chunk_symbols = set(chunk_df["symbol"].unique())
-                new_symbols.update(chunk_symbols)
-                
-                # 分类记录
-                chunk_exist = [r for r in chunk_records if r["symbol"] in existing_symbols]
-                chunk_new = [r for r in chunk_records if r["symbol"] not in existing_symbols]
-                
-                exist_records.extend(chunk_exist)
-                new_records.extend(chunk_new)
-                
-                # 清理临时变量
-                del chunk_df, chunk_records, chunk_symbols, chunk_exist, chunk_new
-        else:
-            # 小数据集直接处理
-            records = cleaned_dataframe.to_dict(orient="records")
-            new_symbols = set(cleaned_dataframe["symbol"].unique())
-            
-            # 分类记录
-            exist_records = [r for r in records if r["symbol"] in existing_symbols]
-            new_records = [r for r in records if r["symbol"] not in existing_symbols]
-            
-            # 清理临时变量
-            del records
-        
-        # 清理DataFrame
-        del cleaned_dataframe
-        
-        removed_symbols = existing_symbols - new_symbols
+        # market整列广播一次写入（随后转category），下游批量函数不再
+        # 逐record补写market键
+        cleaned_dataframe["market"] = market_name
+        # 先收窄dtype再做掩码/去重，让后续扫描跑在更窄的缓冲区上
+        cleaned_dataframe = self.optimize_dtypes(cleaned_dataframe)
+
+        # dropna不再单独物化一个新DataFrame，有效行过滤融合进分类
+        # 掩码，对整帧只做一轮C级掩码求值
+        valid_mask = (cleaned_dataframe["symbol"].notna()
+                      & cleaned_dataframe["datetime"].notna())
+        logger.info(f"🧹 [{market_name}] 清洗后有效数据行数: {int(valid_mask.sum())}")
+
+        # 冷启动路径：库内无该市场存量时全部行都是新增，DataFrame经
+        # C层to_csv直接COPY落库，完全跳过to_dict的逐行字典物化
+        # （Arrow/ADBC原生摄取要引入新驱动栈，CSV COPY已是本服务的
+        # 批量协议路径）
+        if not existing_symbols:
+            valid_df = cleaned_dataframe.loc[valid_mask, list(StockSQL.COPY_COLUMNS)]
+            engine = self.get_db_engine()
+            inserted = self.copy_dataframe_to_table(engine, valid_df, "stock_info", StockSQL.COPY_COLUMNS)
+            duration = time.time() - start_time
+            logger.info("-" * 40)
+            logger.info(f"🎉 [{market_name}] 冷启动COPY导入完成！")
+            logger.info(f"⏱️  总耗时: {self.format_duration(duration)}")
+            logger.info(f"📊 处理结果: 新增 {inserted} 条")
+            logger.info("-" * 40)
+            self.log_section_end(f"[{market_name}] 处理结束")
+            return
+
+        # 向量化分类：isin一次C级扫描得到存在掩码（只算一次），按
+        # 掩码切出两个分区后各自物化一次，替代原先先to_dict再Python
+        # 逐条判断的分块循环
+        existing_idx = pd.Index(list(existing_symbols))
+        in_existing = cleaned_dataframe["symbol"].isin(existing_idx)
+        exist_records = cleaned_dataframe.loc[valid_mask & in_existing].to_dict(orient="records")
+        new_records = cleaned_dataframe.loc[valid_mask & ~in_existing].to_dict(orient="records")
+        # 去重与差集都留在pandas哈希表里做，只在传给删除标记的边界
+        # 才物化成Python set
+        new_symbols_idx = pd.Index(cleaned_dataframe.loc[valid_mask, "symbol"]).unique()
+
+        removed_symbols = set(existing_idx.difference(new_symbols_idx))
 
         logger.info("-" * 40)
         logger.info(f"📈 [{market_name}] 数据统计")
@@ -320,26 +336,43 @@ class StockDataProcessor(BaseDataProcessor):
         logger.info(f"📋 准备处理 {len(self.market_configs)} 个市场")
         logger.info("-" * 50)
 
-        processed_markets = 0
+        # 先做开盘状态筛选，闭市市场不进线程池
+        open_markets = []
         skipped_markets = 0
-        
         for conf in self.market_configs:
             market_name = conf["market_name"]
             if check_market_open_status(conf["check_open_func"], 2):
-                logger.info(f"🟢 [{market_name}] 当前或两小时前为开盘时间，开始处理...")
-                existing_symbols = existing_symbols_map.get(market_name, set())
-                self.process_and_sync_stock_data(
-                    market_name,
-                    conf["get_data_func"],
-                    conf["clean_func"],
-                    existing_symbols,
-                    concurrency=conf["concurrency"],
-                )
-                processed_markets += 1
+                logger.info(f"🟢 [{market_name}] 当前或两小时前为开盘时间，进入并行处理队列")
+                open_markets.append(conf)
             else:
                 logger.info(f"🔴 [{market_name}] 当前及两小时前均非开盘时间，跳过处理")
                 skipped_markets += 1
-        
+
+        # 各市场访问不同上游接口、写各自的行集，互不依赖，并行后
+        # 总耗时趋近最慢市场而非各市场之和
+        processed_markets = 0
+        if open_markets:
+            with ThreadPoolExecutor(max_workers=len(open_markets)) as executor:
+                futures = {
+                    executor.submit(
+                        self.process_and_sync_stock_data,
+                        conf["market_name"],
+                        conf["get_data_func"],
+                        conf["clean_func"],
+                        existing_symbols_map.get(conf["market_name"], set()),
+                        conf["concurrency"],
+                    ): conf["market_name"]
+                    for conf in open_markets
+                }
+                for future in as_completed(futures):
+                    market_name = futures[future]
+                    try:
+                        future.result()
+                        processed_markets += 1
+                    except Exception as e:
+                        logger.error(f"❌ [{market_name}] 市场处理异常: {e}", exc_info=True)
+
+
         return {
             "processed": processed_markets,
             "skipped": skipped_markets
@@ -377,19 +410,33 @@ class StockDataProcessor(BaseDataProcessor):
         concurrency=2,
     ):
         """处理市场记录的批量操作"""
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+        # 池小于并发时多出的线程只会在checkout上排队，提前提示运维
+        # 通过DB_POOL_SIZE调大（默认值按各市场concurrency之和推算）
+        pool = getattr(engine, "pool", None)
+        if pool is not None and hasattr(pool, "size") and pool.size() < concurrency:
+            logger.warning(f"⚠️ [{market_name}] 连接池大小 {pool.size()} 小于并发数 {concurrency}，批次可能排队等待连接")
 
         failed_update_symbols = []
 
+        # 批量函数自身吞掉异常并通过error返回，结果顺序无关紧要，
+        # executor.map 比 submit+as_completed 少一层future簿记
+        #
+        # 每个任务吃下batch_size*10的大切片：COPY/execute_values本身
+        # 按批在服务端分页，切片放大只减少连接checkout和临时表建表
+        # 次数，不增加单语句规模
+        slice_size = batch_size * 10
         total_updated = 0
         total_update_duration = 0.0
+        update_batches = [
+            (exist_records[i:i + slice_size], idx + 1)
+            for idx, i in enumerate(range(0, len(exist_records), slice_size))
+        ]
         with ThreadPoolExecutor(max_workers=concurrency) as executor:
-            futures = [
-                executor.submit(update_stock_records_batch, engine, exist_records[i:i+batch_size], idx+1, market_name, failed_update_symbols)
-                for idx, i in enumerate(range(0, len(exist_records), batch_size))
-            ]
-            for future in as_completed(futures):
-                updated, duration, error = future.result()
+            results = executor.map(
+                lambda args: update_stock_records_batch(engine, args[0], args[1], market_name, failed_update_symbols),
+                update_batches
+            )
+            for updated, duration, error in results:
                 if error is None:
                     total_updated += updated
                     total_update_duration += duration
@@ -399,13 +446,16 @@ class StockDataProcessor(BaseDataProcessor):
         total_inserted = 0
         total_insert_duration = 0.0
         if new_records:
+            insert_batches = [
+                (new_records[i:i + slice_size], idx + 1)
+                for idx, i in enumerate(range(0, len(new_records), slice_size))
+            ]
             with ThreadPoolExecutor(max_workers=concurrency) as executor:
-                futures = [
-                    executor.submit(insert_stock_records_batch, engine, new_records[i:i+batch_size], idx+1, market_name)
-                    for idx, i in enumerate(range(0, len(new_records), batch_size))
-                ]
-                for future in as_completed(futures):
-                    inserted, duration, error = future.result()
+                results = executor.map(
+                    lambda args: insert_stock_records_batch(engine, args[0], args[1], market_name),
+                    insert_batches
+                )
+                for inserted, duration, error in results:
                     if error is None:
                         total_inserted += inserted
                         total_insert_duration += duration
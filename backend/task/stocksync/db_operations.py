@@ -1,48 +1,146 @@
+import csv
+import io
 import logging
 import traceback
 import threading
 import time
+from collections import defaultdict
 from sqlalchemy import text
+from psycopg2.extras import execute_batch
 
 # 导入统一的SQL管理
 from common import StockSQL
+from common.cache import existing_codes_cache
 
 logger = logging.getLogger(__name__)
 
 # 使用统一的SQL定义
 UPDATE_SQL = StockSQL.UPDATE_STOCK
 INSERT_SQL = StockSQL.INSERT_STOCK
-MARK_DELETE_SQL = StockSQL.MARK_STOCKS_DELETED
 GET_EXISTING_SYMBOLS_SQL = StockSQL.GET_EXISTING_SYMBOLS
 
+# COPY临时表批量路径使用的语句（raw psycopg2游标执行）
+CREATE_STAGE_SQL = """
+    CREATE TEMP TABLE stock_stage
+    (LIKE stock_info INCLUDING DEFAULTS) ON COMMIT DROP
+"""
+
+# 更新只灌入行情字段+symbol，market由参数带入
+UPDATE_STAGE_COLUMNS = (
+    "symbol", "price", "diff", "chg", "best_bid_price", "best_ask_price",
+    "preclose", "open", "high", "low", "volume", "turnover",
+    "mktcap", "pe", "datetime"
+)
+
+UPDATE_FROM_STAGE_SQL = """
+    UPDATE stock_info SET
+        price = s.price,
+        diff = s.diff,
+        chg = s.chg,
+        best_bid_price = s.best_bid_price,
+        best_ask_price = s.best_ask_price,
+        preclose = s.preclose,
+        open = s.open,
+        high = s.high,
+        low = s.low,
+        volume = s.volume,
+        turnover = s.turnover,
+        mktcap = s.mktcap,
+        pe = s.pe,
+        datetime = s.datetime
+    FROM stock_stage s
+    WHERE stock_info.symbol = s.symbol AND stock_info.market = %(market)s
+"""
+
+# 临时表里join不上目标表的symbol即"更新未影响行"
+STAGE_MISSED_SYMBOLS_SQL = """
+    SELECT s.symbol FROM stock_stage s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM stock_info
+        WHERE stock_info.symbol = s.symbol AND stock_info.market = %(market)s
+    )
+"""
+
+INSERT_FROM_STAGE_SQL = """
+    INSERT INTO stock_info ({cols})
+    SELECT {cols} FROM stock_stage
+    ON CONFLICT (symbol, market) DO NOTHING
+""".format(cols=", ".join(StockSQL.COPY_COLUMNS))
+
+# 标记删除按分片循环执行，退市高峰的超大symbol数组不进单次规划
+DELETE_CHUNK_SIZE = 5000
+RAW_MARK_DELETE_SQL = """
+    UPDATE stock_info SET status = 'D'
+    WHERE market = %s AND symbol = ANY(%s)
+"""
+
+# execute_batch降级重试路径使用的pyformat版更新语句（raw游标执行）
+RAW_UPDATE_SQL = """
+    UPDATE stock_info SET
+        price = %(price)s,
+        diff = %(diff)s,
+        chg = %(chg)s,
+        best_bid_price = %(best_bid_price)s,
+        best_ask_price = %(best_ask_price)s,
+        preclose = %(preclose)s,
+        open = %(open)s,
+        high = %(high)s,
+        low = %(low)s,
+        volume = %(volume)s,
+        turnover = %(turnover)s,
+        mktcap = %(mktcap)s,
+        pe = %(pe)s,
+        datetime = %(datetime)s
+    WHERE symbol = %(symbol)s AND market = %(market)s
+"""
+
+
+def _copy_records_to_stage(cursor, records, columns):
+    """建临时表并把记录按列序COPY进stock_stage"""
+    cursor.execute(CREATE_STAGE_SQL)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for record in records:
+        writer.writerow(['' if record.get(col) is None else record.get(col) for col in columns])
+    buf.seek(0)
+    cursor.copy_expert(
+        f"COPY stock_stage({', '.join(columns)}) FROM STDIN WITH (FORMAT csv, NULL '')",
+        buf
+    )
+
 
 def get_existing_stock_symbols_by_market(engine):
     """获取数据库中已存在的股票symbol列表，按市场分类"""
+    cached = existing_codes_cache.get(('stock_info', 'L'))
+    if cached is not None:
+        logger.info(f"📊 命中已存在股票symbol缓存: {sum(len(s) for s in cached.values())} 条")
+        return cached
+
     logger.info("📊 开始查询数据库中的已存在股票symbol列表")
-    symbol_map = {}
+    # SELECT列序固定为(symbol, market)，行直接按位置解包；
+    # stream_results走服务端游标分块取行，不一次性物化全量结果
+    symbol_map = defaultdict(set)
+    count = 0
     try:
         with engine.connect() as conn:
-            result = conn.execute(GET_EXISTING_SYMBOLS_SQL)
-            count = 0
-            for row in result:
-                try:
-                    market = row._mapping['market']
-                    symbol = row._mapping['symbol']
-                except AttributeError:
-                    market = row[1]
-                    symbol = row[0]
-                symbol_map.setdefault(market, set()).add(symbol)
+            result = conn.execution_options(
+                stream_results=True, yield_per=10000
+            ).execute(GET_EXISTING_SYMBOLS_SQL)
+            for symbol, market in result:
+                symbol_map[market].add(symbol)
                 count += 1
-        
+        symbol_map = dict(symbol_map)
+
         # 统计信息
         market_stats = {m: len(s) for m, s in symbol_map.items()}
         logger.info(f"✅ 查询完成，数据库股票总记录数：{count}")
         logger.info(f"📈 市场分类统计：{market_stats}")
+        existing_codes_cache.set(('stock_info', 'L'), symbol_map)
         return symbol_map
     except Exception as e:
         logger.error(f"❌ 查询数据库股票symbol列表异常: {e}")
         logger.error(traceback.format_exc())
-        return symbol_map
+        return dict(symbol_map)
 
 
 def update_stock_records_batch(engine, batch_records, batch_num, market_name, failed_symbols):
@@ -58,33 +156,57 @@ def update_stock_records_batch(engine, batch_records, batch_num, market_name, fa
 
     start_time = time.time()
     try:
-        with engine.begin() as conn:
-            # 使用executemany进行批量更新，提升性能
-            batch_data = []
-            for record in batch_records:
-                record['market'] = market_name
-                batch_data.append(record)
-            
+        # 主路径：COPY灌临时表 + 单条UPDATE ... FROM，整批一次解析一次
+        # 扫描，替代每行一次的UPDATE往返
+        try:
+            raw_conn = engine.raw_connection()
+            try:
+                with raw_conn.cursor() as cursor:
+                    _copy_records_to_stage(cursor, batch_records, UPDATE_STAGE_COLUMNS)
+                    cursor.execute(UPDATE_FROM_STAGE_SQL, {"market": market_name})
+                    updated = cursor.rowcount
+                    if updated < len(batch_records):
+                        # 反查join不上的symbol，保持失败清单语义
+                        cursor.execute(STAGE_MISSED_SYMBOLS_SQL, {"market": market_name})
+                        missed = [row[0] for row in cursor.fetchall()]
+                        failed_symbols.extend(missed)
+                        logger.warning(f"⚠️ [{market_name}][{threadbare}] 更新未影响行 {len(missed)} 条: {missed[:20]}")
+                raw_conn.commit()
+            except Exception:
+                raw_conn.rollback()
+                raise
+            finally:
+                raw_conn.close()
+        except Exception as e:
+            # COPY路径失败回退到executemany批量更新
+            logger.warning(f"⚠️ [{market_name}][{threadbare}] COPY更新失败，回退到executemany: {e}")
+            # market已在DataFrame阶段整列写入，无需逐record补键
+            batch_data = batch_records
             try:
-                # 批量执行更新
-                result = conn.execute(UPDATE_SQL, batch_data)
-                # 检查是否有记录未被更新
-                for i, record in enumerate(batch_data):
-                    if i < len(batch_data) and not hasattr(result, 'rowcount') or result.rowcount == 0:
-                        failed_symbols.append(record['symbol'])
-                        logger.warning(f"⚠️ [{market_name}][{threadbare}] 更新未影响行，symbol={record['symbol']}")
+                with engine.begin() as conn:
+                    conn.execute(UPDATE_SQL, batch_data)
             except Exception as e:
-                # 如果批量更新失败，回退到逐条更新
-                logger.warning(f"⚠️ [{market_name}][{threadbare}] 批量更新失败，回退到逐条更新: {e}")
-                for record in batch_data:
+                # 整批失败：按100行子批各自成事务用execute_batch重试，
+                # 坏行只拖累它所在的子批，降级路径不再退化成每行一次往返
+                logger.warning(f"⚠️ [{market_name}][{threadbare}] 批量更新失败，按子批重试: {e}")
+                for sub_start in range(0, len(batch_data), 100):
+                    sub = batch_data[sub_start:sub_start + 100]
                     try:
-                        res = conn.execute(UPDATE_SQL, record)
-                        if res.rowcount == 0:
-                            failed_symbols.append(record['symbol'])
-                            logger.warning(f"⚠️ [{market_name}][{threadbare}] 更新未影响行，symbol={record['symbol']}")
-                    except Exception as e:
-                        logger.error(f"❌ [{market_name}][{threadbare}] 批次 {batch_num} 更新失败，symbol={record.get('symbol')}, 错误: {e}")
-                        failed_symbols.append(record.get('symbol'))
+                        with engine.begin() as conn:
+                            with conn.connection.cursor() as cursor:
+                                execute_batch(cursor, RAW_UPDATE_SQL, sub, page_size=100)
+                    except Exception:
+                        # 子批失败才逐行定位坏行
+                        for record in sub:
+                            try:
+                                with engine.begin() as conn:
+                                    res = conn.execute(UPDATE_SQL, record)
+                                    if res.rowcount == 0:
+                                        failed_symbols.append(record['symbol'])
+                                        logger.warning(f"⚠️ [{market_name}][{threadbare}] 更新未影响行，symbol={record['symbol']}")
+                            except Exception as e:
+                                logger.error(f"❌ [{market_name}][{threadbare}] 批次 {batch_num} 更新失败，symbol={record.get('symbol')}, 错误: {e}")
+                                failed_symbols.append(record.get('symbol'))
         duration = time.time() - start_time
         logger.info(f"✅ [{market_name}][{threadbare}] 更新批次 {batch_num} 完成，耗时 {duration:.4f} 秒")
         return len(batch_records), duration, None
@@ -108,25 +230,35 @@ def insert_stock_records_batch(engine, batch_records, batch_num, market_name):
 
     start_time = time.time()
     try:
-        with engine.begin() as conn:
-            # 准备批量插入数据
-            batch_data = []
-            for record in batch_records:
-                record['market'] = market_name
-                batch_data.append(record)
-            
+        # 主路径：COPY灌临时表 + INSERT ... SELECT ... ON CONFLICT DO NOTHING，
+        # 整批一次批量协议导入；market已在DataFrame阶段整列写入
+        try:
+            raw_conn = engine.raw_connection()
             try:
-                # 使用executemany进行批量插入，提升性能
-                conn.execute(INSERT_SQL, batch_data)
-            except Exception as e:
-                # 如果批量插入失败，回退到逐条插入
-                logger.warning(f"⚠️ [{market_name}][{threadname}] 批量插入失败，回退到逐条插入: {e}")
-                for record in batch_data:
-                    try:
-                        conn.execute(INSERT_SQL, record)
-                    except Exception as e:
-                        logger.error(f"❌ [{market_name}][{threadname}] 批次 {batch_num} 插入失败，symbol={record.get('symbol')}, 错误: {e}")
-        
+                with raw_conn.cursor() as cursor:
+                    _copy_records_to_stage(cursor, batch_records, StockSQL.COPY_COLUMNS)
+                    cursor.execute(INSERT_FROM_STAGE_SQL)
+                raw_conn.commit()
+            except Exception:
+                raw_conn.rollback()
+                raise
+            finally:
+                raw_conn.close()
+        except Exception as e:
+            # COPY路径失败回退到executemany批量插入
+            logger.warning(f"⚠️ [{market_name}][{threadname}] COPY插入失败，回退到executemany: {e}")
+            with engine.begin() as conn:
+                try:
+                    conn.execute(INSERT_SQL, batch_records)
+                except Exception as e:
+                    # 批量插入也失败，回退到逐条插入
+                    logger.warning(f"⚠️ [{market_name}][{threadname}] 批量插入失败，回退到逐条插入: {e}")
+                    for record in batch_records:
+                        try:
+                            conn.execute(INSERT_SQL, record)
+                        except Exception as e:
+                            logger.error(f"❌ [{market_name}][{threadname}] 批次 {batch_num} 插入失败，symbol={record.get('symbol')}, 错误: {e}")
+
         duration = time.time() - start_time
         logger.info(f"✅ [{market_name}][{threadname}] 插入批次 {batch_num} 完成，耗时 {duration:.4f} 秒")
         return len(batch_records), duration, None
@@ -142,24 +274,38 @@ def mark_stocks_as_deleted(engine, symbols_to_delete, market_name):
     threadbare = threading.current_thread().name
     if not symbols_to_delete:
         logger.info(f"✅ [{market_name}][{threadbare}] 无需标记删除的股票")
-        return 0
-    
+        return 0, 0.0
+
     if len(symbols_to_delete) <= 20:
         logger.info(f"📝 [{market_name}][{threadbare}] 标记删除股票symbols: {list(symbols_to_delete)}")
     else:
         logger.info(f"📝 [{market_name}][{threadbare}] 标记删除股票symbols（前20个）: {list(symbols_to_delete)[:20]}")
     logger.info(f"🗑️ [{market_name}][{threadbare}] 标记删除股票数量：{len(symbols_to_delete)}")
     
+    symbols = list(symbols_to_delete)
+    start_time = time.time()
     try:
-        start_time = time.time()
-        with engine.begin() as conn:
-            res = conn.execute(MARK_DELETE_SQL, {"symbols": list(symbols_to_delete), "market": market_name})
-            count = res.rowcount
+        count = 0
+        raw_conn = engine.raw_connection()
+        try:
+            with raw_conn.cursor() as cursor:
+                # 同一条语句按5000分片循环执行，首个分片后计划即可
+                # 复用；单事务内汇总各分片rowcount
+                for i in range(0, len(symbols), DELETE_CHUNK_SIZE):
+                    cursor.execute(RAW_MARK_DELETE_SQL,
+                                   (market_name, symbols[i:i + DELETE_CHUNK_SIZE]))
+                    count += cursor.rowcount
+            raw_conn.commit()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
         duration = time.time() - start_time
         logger.info(f"✅ [{market_name}][{threadbare}] 标记删除完成，受影响行数：{count}，耗时 {duration:.4f} 秒")
-        return count
+        return count, duration
     except Exception as e:
         duration = time.time() - start_time
         logger.error(f"❌ [{market_name}][{threadbare}] 标记删除失败，错误: {e}，耗时 {duration:.4f} 秒")
         logger.error(traceback.format_exc())
-        return 0
+        return 0, duration
@@ -50,9 +50,9 @@ def sync_task_runner():
         return {'success': False, 'error': str(e)}
     finally:
         total_duration = time.time() - start_time
-        # 创建临时处理器实例来使用format_duration方法
-        temp_processor = StockDataProcessor()
-        logger.info(f"⏱️  总耗时: {temp_processor.format_duration(total_duration)}")
+        # format_duration是静态方法，不必为打印一个数字重跑整套
+        # 工厂初始化
+        logger.info(f"⏱️  总耗时: {StockDataProcessor.format_duration(total_duration)}")
 
 
 def handler(event, context):
@@ -1,18 +1,38 @@
 import datetime
 
+# 各市场交易时段，预计算为"当日秒数"区间常量，热路径只做整数比较，
+# 不再每次调用重建datetime.time对象；容错秒数在比较时加减
+_A_SESSIONS = ((9 * 3600 + 30 * 60, 11 * 3600 + 30 * 60),
+               (13 * 3600, 15 * 3600))
+_HK_SESSIONS = ((9 * 3600 + 30 * 60, 12 * 3600),
+                (13 * 3600, 16 * 3600))
+# 美股跨日时段拆成晚间+凌晨两段
+_US_DST_SESSIONS = ((21 * 3600 + 30 * 60, 23 * 3600 + 59 * 60 + 59),
+                    (0, 4 * 3600))
+_US_STD_SESSIONS = ((22 * 3600 + 30 * 60, 23 * 3600 + 59 * 60 + 59),
+                    (0, 5 * 3600))
+
+def _time_to_seconds(t):
+    """时间转当日秒数"""
+    return t.hour * 3600 + t.minute * 60 + t.second
+
+def _in_sessions(sessions, now, tolerance_seconds):
+    """检查时间是否落在任一交易时段内（含容错）"""
+    if now is None:
+        now = datetime.datetime.now().time()
+    check_seconds = _time_to_seconds(now)
+    return any(lo - tolerance_seconds <= check_seconds <= hi + tolerance_seconds
+               for lo, hi in sessions)
+
 def is_time_between(start_time, end_time, check_time=None, tolerance_seconds=30):
     """检查时间是否在指定区间内，支持容错时间"""
     if check_time is None:
         check_time = datetime.datetime.now().time()
-    
-    # 将时间转换为秒数进行计算，便于处理容错
-    def time_to_seconds(t):
-        return t.hour * 3600 + t.minute * 60 + t.second
-    
-    start_seconds = time_to_seconds(start_time) - tolerance_seconds
-    end_seconds = time_to_seconds(end_time) + tolerance_seconds
-    check_seconds = time_to_seconds(check_time)
-    
+
+    start_seconds = _time_to_seconds(start_time) - tolerance_seconds
+    end_seconds = _time_to_seconds(end_time) + tolerance_seconds
+    check_seconds = _time_to_seconds(check_time)
+
     if start_time <= end_time:
         # 正常时间区间
         return start_seconds <= check_seconds <= end_seconds
@@ -22,28 +42,16 @@ def is_time_between(start_time, end_time, check_time=None, tolerance_seconds=30)
 
 def is_a_stock_market_open(now=None, tolerance_seconds=30):
     """检查A股市场是否开盘"""
-    if now is None:
-        now = datetime.datetime.now().time()
-    return is_time_between(datetime.time(9, 30), datetime.time(11, 30), now, tolerance_seconds) or \
-           is_time_between(datetime.time(13, 0), datetime.time(15, 0), now, tolerance_seconds)
+    return _in_sessions(_A_SESSIONS, now, tolerance_seconds)
 
 def is_hk_stock_market_open(now=None, tolerance_seconds=30):
     """检查港股市场是否开盘"""
-    if now is None:
-        now = datetime.datetime.now().time()
-    return is_time_between(datetime.time(9, 30), datetime.time(12, 0), now, tolerance_seconds) or \
-           is_time_between(datetime.time(13, 0), datetime.time(16, 0), now, tolerance_seconds)
+    return _in_sessions(_HK_SESSIONS, now, tolerance_seconds)
 
 def is_us_stock_market_open(now=None, is_dst=True, tolerance_seconds=30):
     """检查美股市场是否开盘"""
-    if now is None:
-        now = datetime.datetime.now().time()
-    if is_dst:
-        return is_time_between(datetime.time(21, 30), datetime.time(23, 59, 59), now, tolerance_seconds) or \
-               is_time_between(datetime.time(0, 0), datetime.time(4, 0), now, tolerance_seconds)
-    else:
-        return is_time_between(datetime.time(22, 30), datetime.time(23, 59, 59), now, tolerance_seconds) or \
-               is_time_between(datetime.time(0, 0), datetime.time(5, 0), now, tolerance_seconds)
+    sessions = _US_DST_SESSIONS if is_dst else _US_STD_SESSIONS
+    return _in_sessions(sessions, now, tolerance_seconds)
 
 def check_market_open_status(check_func, hours_delay=2, tolerance_seconds=30):
     """检查市场开盘状态（包括当前时间和延迟时间）"""
@@ -60,5 +68,5 @@ def check_market_open_status(check_func, hours_delay=2, tolerance_seconds=30):
     else:
         open_now = check_func(current_time, tolerance_seconds)
         open_delayed = check_func(delayed_time, tolerance_seconds)
-    
+
     return open_now or open_delayed
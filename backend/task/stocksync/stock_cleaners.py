@@ -1,93 +1,116 @@
 import pandas as pd
 from datetime import datetime
 
+# 各市场数值列的源列→目标列映射；数值转换对列子集一次apply完成，
+# 替代逐列to_numeric的十余次独立调度
+_A_NUMERIC_COLS = {
+    "最新价": "price", "涨跌额": "diff", "涨跌幅": "chg",
+    "买入": "best_bid_price", "卖出": "best_ask_price",
+    "昨收": "preclose", "今开": "open", "最高": "high", "最低": "low",
+    "成交量": "volume", "成交额": "turnover",
+}
+
+_HK_NUMERIC_COLS = {
+    "最新价": "price", "涨跌额": "diff", "涨跌幅": "chg",
+    "买一": "best_bid_price", "卖一": "best_ask_price",
+    "昨收": "preclose", "今开": "open", "最高": "high", "最低": "low",
+    "成交量": "volume", "成交额": "turnover",
+}
+
+_US_NUMERIC_COLS = ("price", "diff", "chg", "preclose", "open", "high", "low", "volume")
+
+# 展示精度的行情列出生即float32，省一半内存与下游序列化带宽；
+# turnover/mktcap量级大，保留float64避免精度损失
+_PRICE_COLS = ("price", "diff", "chg", "best_bid_price", "best_ask_price",
+               "preclose", "open", "high", "low")
+
+def _narrow_numeric(numeric_df):
+    """把展示精度的行情列downcast到float32"""
+    for col in _PRICE_COLS:
+        if col in numeric_df.columns:
+            numeric_df[col] = pd.to_numeric(numeric_df[col], downcast="float")
+    return numeric_df
+
+def _volume_series(numeric_df):
+    """成交量列：填0后downcast到能容纳实际取值的最小整型"""
+    return pd.to_numeric(numeric_df["volume"].fillna(0).astype("int64"),
+                         downcast="integer")
+
 def clean_a_stock_data(dataframe):
     """清洗A股股票数据"""
     today_str = datetime.now().strftime("%Y-%m-%d")
-    datetime_series = pd.to_datetime(today_str + ' ' + dataframe["时间戳"], errors='coerce')
+    # 时间戳列只有HH:MM:SS，按timedelta解析后加上当天零点，免去逐行
+    # 字符串拼接和无format时的慢速日期推断
+    datetime_series = pd.Timestamp(today_str) + pd.to_timedelta(dataframe["时间戳"], errors='coerce')
 
-    cleaned_dataframe = pd.DataFrame({
-        "symbol": dataframe["代码"].astype(str),
-        "cname": dataframe.get("名称", pd.Series([""]*len(dataframe))).astype(str),
-        "name": dataframe.get("名称", pd.Series([""]*len(dataframe))).astype(str),
-        "price": pd.to_numeric(dataframe["最新价"], errors="coerce"),
-        "diff": pd.to_numeric(dataframe["涨跌额"], errors="coerce"),
-        "chg": pd.to_numeric(dataframe["涨跌幅"], errors="coerce"),
-        "best_bid_price": pd.to_numeric(dataframe["买入"], errors="coerce"),
-        "best_ask_price": pd.to_numeric(dataframe["卖出"], errors="coerce"),
-        "preclose": pd.to_numeric(dataframe["昨收"], errors="coerce"),
-        "open": pd.to_numeric(dataframe["今开"], errors="coerce"),
-        "high": pd.to_numeric(dataframe["最高"], errors="coerce"),
-        "low": pd.to_numeric(dataframe["最低"], errors="coerce"),
-        "volume": pd.to_numeric(dataframe["成交量"], errors="coerce").fillna(0).astype(int),
-        "turnover": pd.to_numeric(dataframe["成交额"], errors="coerce"),
-        "datetime": datetime_series,
-        "category": None,
-        "category_id": None,
-        "amplitude": None,
-        "mktcap": None,
-        "pe": None,
-        "market": "A股",
-        "status": "L"
-    })
+    numeric_df = dataframe[list(_A_NUMERIC_COLS)].apply(pd.to_numeric, errors="coerce")
+    numeric_df.columns = list(_A_NUMERIC_COLS.values())
+    numeric_df = _narrow_numeric(numeric_df)
+
+    name_series = dataframe.get("名称", pd.Series([""] * len(dataframe))).astype(str)
+    cleaned_dataframe = numeric_df.assign(
+        symbol=dataframe["代码"].astype(str),
+        cname=name_series,
+        name=name_series,
+        volume=_volume_series(numeric_df),
+        datetime=datetime_series,
+        category=None,
+        category_id=None,
+        amplitude=None,
+        mktcap=None,
+        pe=None,
+        market="A股",
+        status="L",
+    )
     return cleaned_dataframe.dropna(subset=["symbol", "datetime"])
 
 def clean_hk_stock_data(dataframe):
     """清洗港股股票数据"""
     datetime_series = pd.to_datetime(dataframe['日期时间'], errors='coerce')
-    cleaned_dataframe = pd.DataFrame({
-        "symbol": dataframe["代码"].astype(str),
-        "cname": dataframe.get("中文名称", pd.Series([""] * len(dataframe))).astype(str),
-        "name": dataframe.get("英文名称", pd.Series([""] * len(dataframe))).astype(str),
-        "price": pd.to_numeric(dataframe["最新价"], errors="coerce"),
-        "diff": pd.to_numeric(dataframe["涨跌额"], errors="coerce"),
-        "chg": pd.to_numeric(dataframe["涨跌幅"], errors="coerce"),
-        "best_bid_price": pd.to_numeric(dataframe["买一"], errors="coerce"),
-        "best_ask_price": pd.to_numeric(dataframe["卖一"], errors="coerce"),
-        "preclose": pd.to_numeric(dataframe["昨收"], errors="coerce"),
-        "open": pd.to_numeric(dataframe["今开"], errors="coerce"),
-        "high": pd.to_numeric(dataframe["最高"], errors="coerce"),
-        "low": pd.to_numeric(dataframe["最低"], errors="coerce"),
-        "volume": pd.to_numeric(dataframe["成交量"], errors="coerce").fillna(0).astype(int),
-        "turnover": pd.to_numeric(dataframe["成交额"], errors="coerce"),
-        "datetime": datetime_series,
-        "category": None,
-        "category_id": None,
-        "amplitude": None,
-        "mktcap": None,
-        "pe": None,
-        "market": "港股",
-        "status": "L"
-    })
+
+    numeric_df = dataframe[list(_HK_NUMERIC_COLS)].apply(pd.to_numeric, errors="coerce")
+    numeric_df.columns = list(_HK_NUMERIC_COLS.values())
+    numeric_df = _narrow_numeric(numeric_df)
+
+    cleaned_dataframe = numeric_df.assign(
+        symbol=dataframe["代码"].astype(str),
+        cname=dataframe.get("中文名称", pd.Series([""] * len(dataframe))).astype(str),
+        name=dataframe.get("英文名称", pd.Series([""] * len(dataframe))).astype(str),
+        volume=_volume_series(numeric_df),
+        datetime=datetime_series,
+        category=None,
+        category_id=None,
+        amplitude=None,
+        mktcap=None,
+        pe=None,
+        market="港股",
+        status="L",
+    )
     return cleaned_dataframe.dropna(subset=["symbol", "datetime"])
 
 def clean_us_stock_data(dataframe):
     """清洗美股股票数据"""
-    from datetime import datetime
     current_datetime = datetime.now()
     amplitude_float = dataframe["amplitude"].str.rstrip('%').astype(float) if "amplitude" in dataframe.columns else None
-    cleaned_dataframe = pd.DataFrame({
-        "symbol": dataframe["symbol"].astype(str),
-        "cname": dataframe.get("cname", pd.Series([""]*len(dataframe))).astype(str),
-        "name": dataframe.get("name", pd.Series([""]*len(dataframe))).astype(str),
-        "category": dataframe.get("category", None),
-        "category_id": pd.to_numeric(dataframe.get("category_id", pd.Series([None]*len(dataframe))), errors="coerce").fillna(0).astype(int),
-        "price": pd.to_numeric(dataframe["price"], errors="coerce"),
-        "diff": pd.to_numeric(dataframe["diff"], errors="coerce"),
-        "chg": pd.to_numeric(dataframe["chg"], errors="coerce"),
-        "preclose": pd.to_numeric(dataframe["preclose"], errors="coerce"),
-        "open": pd.to_numeric(dataframe["open"], errors="coerce"),
-        "high": pd.to_numeric(dataframe["high"], errors="coerce"),
-        "low": pd.to_numeric(dataframe["low"], errors="coerce"),
-        "amplitude": amplitude_float,
-        "volume": pd.to_numeric(dataframe["volume"], errors="coerce").fillna(0).astype(int),
-        "mktcap": pd.to_numeric(dataframe.get("mktcap", None), errors="coerce"),
-        "pe": pd.to_numeric(dataframe.get("pe", None), errors="coerce"),
-        "datetime": current_datetime,
-        "best_bid_price": None,
-        "best_ask_price": None,
-        "turnover": None,
-        "market": "美股",
-        "status": "L"
-    })
+
+    numeric_df = dataframe[list(_US_NUMERIC_COLS)].apply(pd.to_numeric, errors="coerce")
+    numeric_df = _narrow_numeric(numeric_df)
+
+    cleaned_dataframe = numeric_df.assign(
+        symbol=dataframe["symbol"].astype(str),
+        cname=dataframe.get("cname", pd.Series([""] * len(dataframe))).astype(str),
+        name=dataframe.get("name", pd.Series([""] * len(dataframe))).astype(str),
+        category=dataframe.get("category", None),
+        category_id=pd.to_numeric(dataframe.get("category_id", pd.Series([None] * len(dataframe))), errors="coerce").fillna(0).astype(int),
+        amplitude=amplitude_float,
+        volume=_volume_series(numeric_df),
+        mktcap=pd.to_numeric(dataframe.get("mktcap", None), errors="coerce"),
+        pe=pd.to_numeric(dataframe.get("pe", None), errors="coerce"),
+        datetime=current_datetime,
+        best_bid_price=None,
+        best_ask_price=None,
+        turnover=None,
+        market="美股",
+        status="L",
+    )
     return cleaned_dataframe.dropna(subset=["symbol"])
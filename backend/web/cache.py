@@ -1,163 +1,209 @@
+import heapq
+import threading
 import time
 import hashlib
 import json
+from array import array
+from collections import OrderedDict
 from typing import Any, Optional, Dict
 from functools import wraps
-from flask import request, jsonify
+from flask import Response, request, jsonify
 from config import config
-from validators import ResponseFormatter
+from validators import response_error
 import logging
 
 logger = logging.getLogger(__name__)
 
 class MemoryCache:
-    """内存缓存实现"""
-    
+    """内存缓存实现
+
+    OrderedDict按访问序维护LRU：命中move_to_end、溢出popitem(last=False)，
+    淘汰是O(1)；过期改为访问时惰性检查，热路径不再全量扫描。
+
+    多线程WSGI下get/set/清理会并发执行，所有入口都持实例级RLock：
+    临界区只有几次dict操作，很短；用RLock是因为set/stats内部
+    还会调用_cleanup_expired。
+    """
+
+    MAX_ENTRIES = 1000   # 超过该容量触发LRU淘汰
+    TRIM_TO = 800        # 淘汰后保留的条目数
+
     def __init__(self):
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._access_times: Dict[str, float] = {}
-    
-    def _cleanup_expired(self):
-        """清理过期缓存"""
-        current_time = time.time()
-        expired_keys = []
-        
-        for key, data in self._cache.items():
-            if current_time > data['expires_at']:
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            del self._cache[key]
-            if key in self._access_times:
-                del self._access_times[key]
-    
-    def get(self, key: str) -> Optional[Any]:
-        """获取缓存值"""
-        self._cleanup_expired()
-        
-        if key in self._cache:
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # (expires_at, key)最小堆：清理只弹出堆顶已到期的条目，
+        # 摊还O(log N)，碰到第一个未到期条目即停
+        self._expiry_heap: list = []
+        self._lock = threading.RLock()
+
+    def _cleanup_expired(self, current_time: float = None):
+        """按到期堆弹出已过期缓存，不再全量扫描
+
+        调用方已经读过时钟时把值传进来，避免同一次操作里重复取时间。
+        """
+        if current_time is None:
             current_time = time.time()
-            if current_time <= self._cache[key]['expires_at']:
-                self._access_times[key] = current_time
-                return self._cache[key]['value']
-            else:
-                del self._cache[key]
-                if key in self._access_times:
-                    del self._access_times[key]
-        
-        return None
-    
+        with self._lock:
+            while self._expiry_heap and self._expiry_heap[0][0] <= current_time:
+                expires_at, key = heapq.heappop(self._expiry_heap)
+                data = self._cache.get(key)
+                # 键被重设后堆里的旧记录已过时，跳过即可
+                if data is not None and data['expires_at'] == expires_at:
+                    del self._cache[key]
+
+    def get(self, key: str) -> Optional[Any]:
+        """获取缓存值（惰性过期检查，命中刷新LRU序）"""
+        with self._lock:
+            data = self._cache.get(key)
+            if data is None:
+                return None
+
+            if time.time() <= data['expires_at']:
+                self._cache.move_to_end(key)
+                return data['value']
+
+            del self._cache[key]
+            return None
+
     def set(self, key: str, value: Any, ttl: int = None) -> None:
         """设置缓存值"""
         if ttl is None:
             ttl = config.CACHE_TTL
-        
+
         current_time = time.time()
-        self._cache[key] = {
-            'value': value,
-            'expires_at': current_time + ttl,
-            'created_at': current_time
-        }
-        self._access_times[key] = current_time
-        
-        # 如果缓存过多，清理最久未访问的
-        if len(self._cache) > 1000:
-            self._cleanup_lru()
-    
-    def _cleanup_lru(self):
-        """清理最久未使用的缓存"""
-        # 保留最近访问的800个缓存项
-        sorted_keys = sorted(self._access_times.items(), key=lambda x: x[1], reverse=True)
-        keys_to_keep = [key for key, _ in sorted_keys[:800]]
-        
-        new_cache = {key: self._cache[key] for key in keys_to_keep if key in self._cache}
-        new_access_times = {key: self._access_times[key] for key in keys_to_keep}
-        
-        self._cache = new_cache
-        self._access_times = new_access_times
-    
+        expires_at = current_time + ttl
+        with self._lock:
+            self._cache[key] = {
+                'value': value,
+                'expires_at': expires_at,
+                'created_at': current_time
+            }
+            self._cache.move_to_end(key)
+            heapq.heappush(self._expiry_heap, (expires_at, key))
+
+            # 缓存过多时先清掉已到期的，再从LRU端逐个弹出，无需排序
+            if len(self._cache) > self.MAX_ENTRIES:
+                self._cleanup_expired(current_time)
+                while len(self._cache) > self.TRIM_TO:
+                    self._cache.popitem(last=False)
+
     def delete(self, key: str) -> None:
         """删除缓存"""
-        if key in self._cache:
-            del self._cache[key]
-        if key in self._access_times:
-            del self._access_times[key]
-    
+        with self._lock:
+            self._cache.pop(key, None)
+
     def clear(self) -> None:
         """清空所有缓存"""
-        self._cache.clear()
-        self._access_times.clear()
-    
+        with self._lock:
+            self._cache.clear()
+            self._expiry_heap.clear()
+
     def stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
-        self._cleanup_expired()
-        return {
-            'total_keys': len(self._cache),
-            'memory_usage_estimate': sum(len(str(v)) for v in self._cache.values()),
-            'oldest_entry': min(self._access_times.values()) if self._access_times else None,
-            'newest_entry': max(self._access_times.values()) if self._access_times else None
-        }
+        with self._lock:
+            self._cleanup_expired()
+            # OrderedDict首尾即最久/最近访问的条目
+            oldest = next(iter(self._cache.values()), None)
+            newest = next(reversed(self._cache.values())) if self._cache else None
+            return {
+                'total_keys': len(self._cache),
+                'memory_usage_estimate': sum(len(str(v)) for v in self._cache.values()),
+                'oldest_entry': oldest['created_at'] if oldest else None,
+                'newest_entry': newest['created_at'] if newest else None
+            }
 
 # 全局缓存实例
 cache = MemoryCache()
 
 class RateLimiter:
-    """限流器实现"""
-    
+    """限流器实现
+
+    每客户端一个预分配的array('d')环形缓冲：时间戳写入固定槽位，
+    头指针指向最老的槽——槽内时间仍在窗口内说明环已满即超限，
+    否则覆盖即可。每次请求零对象分配（裸C double，无float装箱、
+    无deque节点），也没有逐条出队的清理循环。
+
+    客户端记录按hash(client_id)分成16个分片，每片配独立的锁：
+    多线程WSGI下不同客户端大概率落在不同分片，互不阻塞，
+    锁竞争随分片数线性下降。
+    """
+
+    SHARD_COUNT = 16  # 2的幂，取模可用位与
+    _EMPTY = float('-inf')  # 空槽标记，任何cutoff都大于它
+
     def __init__(self):
-        self._requests: Dict[str, list] = {}
-    
-    def _cleanup_old_requests(self, client_id: str, window_seconds: int):
-        """清理过期的请求记录"""
-        current_time = time.time()
-        cutoff_time = current_time - window_seconds
-        
-        if client_id in self._requests:
-            self._requests[client_id] = [
-                req_time for req_time in self._requests[client_id]
-                if req_time > cutoff_time
-            ]
-    
+        self._shards = [{} for _ in range(self.SHARD_COUNT)]
+        self._locks = [threading.Lock() for _ in range(self.SHARD_COUNT)]
+
+    def _shard(self, client_id: str):
+        """定位客户端所在分片及其锁"""
+        idx = hash(client_id) & (self.SHARD_COUNT - 1)
+        return self._shards[idx], self._locks[idx]
+
+    def _ring(self, shard: dict, client_id: str, max_requests: int) -> list:
+        """取客户端的[缓冲, 头指针]，首次使用或限额变化时重建"""
+        entry = shard.get(client_id)
+        if entry is None or len(entry[0]) != max_requests:
+            buf = array('d', [self._EMPTY] * max_requests)
+            if entry is not None:
+                # 同一客户端命中了不同限额的接口：保留最近的时间戳
+                recent = sorted(t for t in entry[0] if t != self._EMPTY)[-max_requests:]
+                for i, ts in enumerate(recent):
+                    buf[i] = ts
+                entry = [buf, len(recent) % max_requests]
+            else:
+                entry = [buf, 0]
+            shard[client_id] = entry
+        return entry
+
     def is_allowed(self, client_id: str, max_requests: int = 100, window_seconds: int = 60) -> bool:
         """检查是否允许请求"""
         current_time = time.time()
-        
-        # 清理过期请求
-        self._cleanup_old_requests(client_id, window_seconds)
-        
-        # 检查请求数量
-        if client_id not in self._requests:
-            self._requests[client_id] = []
-        
-        if len(self._requests[client_id]) >= max_requests:
-            return False
-        
-        # 记录当前请求
-        self._requests[client_id].append(current_time)
-        return True
-    
+        shard, lock = self._shard(client_id)
+
+        with lock:
+            entry = self._ring(shard, client_id, max_requests)
+            buf, head = entry
+
+            # 头指针处是最老的记录：仍在窗口内说明环满，拒绝
+            if buf[head] > current_time - window_seconds:
+                return False
+
+            # 覆盖最老槽位，记录当前请求
+            buf[head] = current_time
+            entry[1] = (head + 1) % max_requests
+            return True
+
     def get_remaining_requests(self, client_id: str, max_requests: int = 100, window_seconds: int = 60) -> int:
         """获取剩余请求次数"""
-        self._cleanup_old_requests(client_id, window_seconds)
-        
-        if client_id not in self._requests:
-            return max_requests
-        
-        return max(0, max_requests - len(self._requests[client_id]))
-    
+        shard, lock = self._shard(client_id)
+        with lock:
+            entry = shard.get(client_id)
+            if entry is None:
+                return max_requests
+            # 只在拒绝路径上调用，线性数一遍窗口内的记录即可
+            cutoff_time = time.time() - window_seconds
+            used = sum(1 for ts in entry[0] if ts > cutoff_time)
+            return max(0, max_requests - used)
+
     def reset_client(self, client_id: str):
         """重置客户端限流记录"""
-        if client_id in self._requests:
-            del self._requests[client_id]
+        shard, lock = self._shard(client_id)
+        with lock:
+            shard.pop(client_id, None)
 
 # 全局限流器实例
 rate_limiter = RateLimiter()
 
 def generate_cache_key(prefix: str, params: dict) -> str:
     """生成缓存键"""
-    # 对参数进行排序和序列化，确保相同参数生成相同的键
+    # 无参数请求直接用常量键，跳过序列化和哈希
+    if not params:
+        return f"{prefix}:-"
+    # 对参数进行排序和序列化，确保相同参数生成相同的键；
+    # 只做缓存键不需要抗碰撞强度，blake2b按字节吞吐优于md5，
+    # 8字节摘要的十六进制与原先截断的md5等长
     sorted_params = json.dumps(params, sort_keys=True, ensure_ascii=False)
-    param_hash = hashlib.md5(sorted_params.encode('utf-8')).hexdigest()[:16]
+    param_hash = hashlib.blake2b(sorted_params.encode('utf-8'), digest_size=8).hexdigest()
     return f"{prefix}:{param_hash}"
 
 def cached(ttl: int = None, key_prefix: str = "api"):
@@ -165,26 +211,35 @@ def cached(ttl: int = None, key_prefix: str = "api"):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # 生成缓存键
-            cache_key = generate_cache_key(
-                f"{key_prefix}:{func.__name__}",
-                dict(request.args)
-            )
-            
-            # 尝试从缓存获取
+            # query_string本身已是规范的bytes表示，直接哈希即可，省掉
+            # MultiDict→dict→json.dumps→encode的四次分配；参数顺序不同
+            # 的等价请求会各占一个键，代价只是多一条缓存条目
+            qs = request.query_string
+            if qs:
+                cache_key = (f"{key_prefix}:{func.__name__}:"
+                             f"{hashlib.blake2b(qs, digest_size=8).hexdigest()}")
+            else:
+                cache_key = f"{key_prefix}:{func.__name__}:-"
+
+            # 尝试从缓存获取：命中时用缓存的bytes重建轻量Response，
+            # 不重走JSON编码和WSGI序列化
             cached_result = cache.get(cache_key)
             if cached_result is not None:
                 logger.debug(f"缓存命中: {cache_key}")
-                return cached_result
-            
+                body, status, headers = cached_result
+                return Response(body, status=status, headers=headers)
+
             # 执行函数
             result = func(*args, **kwargs)
-            
-            # 只缓存成功的响应
+
+            # 只缓存成功的响应；存序列化后的bytes三元组而非Response
+            # 对象本身，条目更小也不持有完整对象图
             if hasattr(result, 'status_code') and result.status_code == 200:
-                cache.set(cache_key, result, ttl)
+                cache.set(cache_key,
+                          (result.get_data(), result.status_code, dict(result.headers)),
+                          ttl)
                 logger.debug(f"缓存设置: {cache_key}")
-            
+
             return result
         return wrapper
     return decorator
@@ -202,7 +257,7 @@ def rate_limited(max_requests: int = 100, window_seconds: int = 60):
                 remaining = rate_limiter.get_remaining_requests(client_id, max_requests, window_seconds)
                 logger.warning(f"客户端 {client_id} 触发限流")
                 
-                return jsonify(ResponseFormatter.error(
+                return jsonify(response_error(
                     message=f"请求过于频繁，请稍后再试。窗口期内最多允许 {max_requests} 次请求",
                     code=429
                 )), 429
@@ -1,41 +1,66 @@
 import psycopg2
+import psycopg2.extras
 import psycopg2.pool
 import logging
 from contextlib import contextmanager
+from functools import lru_cache
 from typing import Optional, Dict, Any, List
 from config import config
 
+# psycopg3可用时优先使用：二进制协议省掉每字段的文本解析，
+# prepare_threshold让高频重复的查询自动升级为预备语句；
+# 未安装则继续走psycopg2
+try:
+    import psycopg
+    from psycopg.rows import dict_row
+    from psycopg_pool import ConnectionPool as _Psycopg3Pool
+    _HAS_PSYCOPG3 = True
+except ImportError:
+    _HAS_PSYCOPG3 = False
+
 logger = logging.getLogger(__name__)
 
+
+def _make_pool(db_config: Dict[str, Any]):
+    """按可用驱动创建连接池（getconn/putconn两种池API一致）"""
+    if _HAS_PSYCOPG3:
+        return _Psycopg3Pool(
+            conninfo=psycopg.conninfo.make_conninfo(**db_config),
+            min_size=1,
+            max_size=10,
+            kwargs={"prepare_threshold": 3},
+        )
+    return psycopg2.pool.ThreadedConnectionPool(minconn=1, maxconn=10, **db_config)
+
+
+def _dict_cursor(conn, name: str):
+    """返回dict行的命名游标（psycopg3用dict_row，psycopg2用RealDictCursor）"""
+    if _HAS_PSYCOPG3:
+        return conn.cursor(name=name, row_factory=dict_row)
+    return conn.cursor(name=name, cursor_factory=psycopg2.extras.RealDictCursor)
+
 class DatabaseManager:
     """数据库连接管理器"""
     
     def __init__(self):
-        self.stock_pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
-        self.fund_pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+        self.stock_pool = None
+        self.fund_pool = None
         self._initialize_pools()
-    
+
     def _initialize_pools(self):
         """初始化连接池"""
+        driver = "psycopg3" if _HAS_PSYCOPG3 else "psycopg2"
         try:
             # 股票数据库连接池
             stock_config = config.get_stock_db_config()
-            self.stock_pool = psycopg2.pool.ThreadedConnectionPool(
-                minconn=1,
-                maxconn=10,
-                **stock_config
-            )
-            logger.info("股票数据库连接池初始化成功")
-            
+            self.stock_pool = _make_pool(stock_config)
+            logger.info(f"股票数据库连接池初始化成功（{driver}）")
+
             # 基金数据库连接池
             fund_config = config.get_fund_db_config()
-            self.fund_pool = psycopg2.pool.ThreadedConnectionPool(
-                minconn=1,
-                maxconn=10,
-                **fund_config
-            )
-            logger.info("基金数据库连接池初始化成功")
-            
+            self.fund_pool = _make_pool(fund_config)
+            logger.info(f"基金数据库连接池初始化成功（{driver}）")
+
         except Exception as e:
             logger.error(f"数据库连接池初始化失败: {str(e)}")
             raise
@@ -75,126 +100,167 @@ class DatabaseManager:
     def close_pools(self):
         """关闭连接池"""
         if self.stock_pool:
-            self.stock_pool.closeall()
+            self.stock_pool.close() if _HAS_PSYCOPG3 else self.stock_pool.closeall()
             logger.info("股票数据库连接池已关闭")
-        
+
         if self.fund_pool:
-            self.fund_pool.closeall()
+            self.fund_pool.close() if _HAS_PSYCOPG3 else self.fund_pool.closeall()
             logger.info("基金数据库连接池已关闭")
 
+# 查询接口实际需要返回的列。显式投影代替SELECT *：
+# 不再把id/insert_time等无用列拉过网络再逐值解码成Python对象
+STOCK_COLUMNS = (
+    "symbol", "cname", "name", "category", "category_id", "market", "status",
+    "price", "diff", "chg", "preclose", "open", "high", "low", "amplitude",
+    "volume", "turnover", "mktcap", "pe", "best_bid_price", "best_ask_price",
+    "datetime", "update_time"
+)
+
+FUND_COLUMNS = (
+    "fund_code", "fund_name", "fund_type", "latest_price", "status", "update_time"
+)
+
+
 class QueryBuilder:
-    """SQL查询构建器"""
-    
+    """SQL查询构建器
+
+    SQL文本只取决于哪些筛选条件出现和排序方向，形态总数很小，
+    用lru_cache按形态记忆拼好的模板；每次请求只剩参数装配，
+    稳定的SQL文本也让驱动侧的预备语句缓存能够命中。
+    """
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _stock_sql(has_market: bool, has_symbol: bool, has_name: bool, order: str) -> str:
+        """按筛选条件形态拼接股票查询SQL模板"""
+        conditions = []
+        if has_market:
+            conditions.append("market = %s")
+        if has_symbol:
+            conditions.append("symbol = %s")
+        conditions.append("status = %s")
+        if has_name:
+            conditions.append("(cname LIKE %s OR name LIKE %s)")
+
+        sql = f"SELECT {', '.join(STOCK_COLUMNS)} FROM {config.STOCK_TABLE}"
+        sql += " WHERE " + " AND ".join(conditions)
+
+        if order in ('asc', 'desc'):
+            sql += f" ORDER BY update_time {order.upper()}"
+        else:
+            sql += " ORDER BY symbol ASC"
+
+        return sql + " LIMIT %s"
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _fund_sql(has_name: bool, has_type: bool, has_code: bool, order: str) -> str:
+        """按筛选条件形态拼接基金查询SQL模板"""
+        conditions = []
+        if has_name:
+            conditions.append("fund_name LIKE %s")
+        if has_type:
+            conditions.append("fund_type = %s")
+        if has_code:
+            conditions.append("fund_code = %s")
+        conditions.append("status = %s")
+
+        sql = f"SELECT {', '.join(FUND_COLUMNS)} FROM {config.FUND_TABLE}"
+        sql += " WHERE " + " AND ".join(conditions)
+
+        if order in ('asc', 'desc'):
+            sql += f" ORDER BY update_time {order.upper()}"
+        else:
+            sql += " ORDER BY fund_code ASC"
+
+        return sql + " LIMIT %s"
+
     @staticmethod
     def build_stock_query(filters: Dict[str, Any]) -> tuple:
         """构建股票查询SQL"""
-        conditions = []
         params = []
-        
+
         # market 筛选（精确匹配）
         if filters.get('market'):
-            conditions.append("market = %s")
             params.append(filters['market'])
-        
+
         # symbol 筛选（精确匹配）
         if filters.get('symbol'):
-            conditions.append("symbol = %s")
             params.append(filters['symbol'])
-        
+
         # status 筛选（精确匹配）
-        status = filters.get('status', 'L')
-        conditions.append("status = %s")
-        params.append(status)
-        
+        params.append(filters.get('status', 'L'))
+
         # name 筛选（模糊匹配）
         if filters.get('name'):
-            conditions.append("(cname LIKE %s OR name LIKE %s)")
             like_pattern = filters['name'] + "%"
             params.extend([like_pattern, like_pattern])
-        
-        # 构建基础SQL
-        sql = f"SELECT * FROM {config.STOCK_TABLE}"
-        if conditions:
-            sql += " WHERE " + " AND ".join(conditions)
-        
-        # 排序
-        order = filters.get('order', '').lower()
-        if order in ('asc', 'desc'):
-            sql += f" ORDER BY update_time {order.upper()}"
-        else:
-            sql += " ORDER BY symbol ASC"
-        
+
+        sql = QueryBuilder._stock_sql(
+            bool(filters.get('market')),
+            bool(filters.get('symbol')),
+            bool(filters.get('name')),
+            filters.get('order', '').lower()
+        )
+
         # 限制
         limit = min(filters.get('limit', config.DEFAULT_LIMIT), config.MAX_LIMIT)
-        sql += " LIMIT %s"
         params.append(limit)
-        
+
         return sql, params
-    
+
     @staticmethod
     def build_fund_query(filters: Dict[str, Any]) -> tuple:
         """构建基金查询SQL"""
-        conditions = []
         params = []
-        
+
         # name 筛选（模糊匹配）
         if filters.get('name'):
-            conditions.append("fund_name LIKE %s")
-            like_pattern = filters['name'] + "%"
-            params.append(like_pattern)
-        
+            params.append(filters['name'] + "%")
+
         # fund_type 筛选（精确匹配）
         if filters.get('type'):
-            conditions.append("fund_type = %s")
             params.append(filters['type'])
-        
+
         # fund_code 筛选（精确匹配）
         if filters.get('code'):
-            conditions.append("fund_code = %s")
             params.append(filters['code'])
-        
+
         # status 筛选（精确匹配）
-        status = filters.get('status', 'L')
-        conditions.append("status = %s")
-        params.append(status)
-        
-        # 构建基础SQL
-        sql = f"SELECT * FROM {config.FUND_TABLE}"
-        if conditions:
-            sql += " WHERE " + " AND ".join(conditions)
-        
-        # 排序
-        order = filters.get('order', '').lower()
-        if order in ('asc', 'desc'):
-            sql += f" ORDER BY update_time {order.upper()}"
-        else:
-            sql += " ORDER BY fund_code ASC"
-        
+        params.append(filters.get('status', 'L'))
+
+        sql = QueryBuilder._fund_sql(
+            bool(filters.get('name')),
+            bool(filters.get('type')),
+            bool(filters.get('code')),
+            filters.get('order', '').lower()
+        )
+
         # 限制
         limit = min(filters.get('limit', config.DEFAULT_LIMIT), config.MAX_LIMIT)
-        sql += " LIMIT %s"
         params.append(limit)
-        
+
         return sql, params
 
 def execute_query(sql: str, params: List[Any], db_type: str = 'stock') -> List[Dict[str, Any]]:
     """执行查询并返回结果"""
     db_manager = get_db_manager()
     
+    # RealDictCursor在取行时于C层直接物化dict，省掉Python级的
+    # zip+dict逐行循环；命名游标走服务端DECLARE CURSOR，按itersize
+    # 分批流到客户端，大LIMIT下不在后端一次性缓冲整个结果集
     if db_type == 'stock':
         with db_manager.get_stock_connection() as conn:
-            with conn.cursor() as cur:
+            with _dict_cursor(conn, 'stock_query') as cur:
+                cur.itersize = 500
                 cur.execute(sql, params)
-                colnames = [desc[0] for desc in cur.description]
-                rows = cur.fetchall()
-                return [dict(zip(colnames, row)) for row in rows]
+                return list(cur)
     else:
         with db_manager.get_fund_connection() as conn:
-            with conn.cursor() as cur:
+            with _dict_cursor(conn, 'fund_query') as cur:
+                cur.itersize = 500
                 cur.execute(sql, params)
-                colnames = [desc[0] for desc in cur.description]
-                rows = cur.fetchall()
-                return [dict(zip(colnames, row)) for row in rows]
+                return list(cur)
 
 # 全局数据库管理器实例（延迟初始化）
 db_manager = None
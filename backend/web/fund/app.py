@@ -1,6 +1,9 @@
 import os
 import psycopg2
+import psycopg2.extras
+import psycopg2.pool
 import logging
+from contextlib import contextmanager
 from flask import Flask, jsonify, request
 
 app = Flask(__name__)
@@ -13,15 +16,37 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 连接池（延迟初始化）：每个请求从池里借连接，省掉每次
+# TCP+认证握手的几十毫秒，突发流量下也不会打满后端连接数
+_pool = None
 
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        _pool = psycopg2.pool.ThreadedConnectionPool(
+            minconn=1,
+            maxconn=10,
+            host=os.environ.get('PG_HOST_OUT'),
+            port=int(os.environ.get('PG_PORT', 5432)),
+            user=os.environ.get('PG_USER'),
+            password=os.environ.get('PG_PASSWORD'),
+            dbname=os.environ.get('PG_DB')
+        )
+    return _pool
+
+
+@contextmanager
 def get_db_connection():
-    return psycopg2.connect(
-        host=os.environ.get('PG_HOST_OUT'),
-        port=int(os.environ.get('PG_PORT', 5432)),
-        user=os.environ.get('PG_USER'),
-        password=os.environ.get('PG_PASSWORD'),
-        dbname=os.environ.get('PG_DB')
-    )
+    pool = _get_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
 
 
 @app.route("/fundinfo", methods=["GET"])
@@ -32,9 +57,6 @@ def stockinfo_handler():
     logger.info(f"[RequestId: {rid}] Raw GET parameters: {dict(request.args)}")
 
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
         conditions = []
         params = []
 
@@ -92,17 +114,14 @@ def stockinfo_handler():
         logger.info(f"[RequestId: {rid}] Executing SQL: {sql}")
         logger.info(f"[RequestId: {rid}] SQL parameters: {params}")
 
-        cur.execute(sql, params)
-
-        colnames = [desc[0] for desc in cur.description]
-        rows = cur.fetchall()
-        result = [dict(zip(colnames, row)) for row in rows]
+        with get_db_connection() as conn:
+            # RealDictCursor在C层把行物化成dict，免去zip(colnames, row)循环
+            with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(sql, params)
+                result = cur.fetchall()
 
         logger.info(f"[RequestId: {rid}] Query returned {len(result)} rows.")
 
-        cur.close()
-        conn.close()
-
         return jsonify(result)
 
     except Exception as e:
@@ -22,6 +22,9 @@ WITH (
 -- Create unique index for fund_code
 CREATE UNIQUE INDEX idx_fund_test_code ON public.fund_test (fund_code);
 
+-- varchar_pattern_ops让左锚定的LIKE 'foo%'（/fundinfo的name筛选）走索引
+CREATE INDEX idx_fund_test_name_pattern ON public.fund_test (fund_name varchar_pattern_ops);
+
 -- Table Triggers
 create trigger trg_fund_test_update_time before
 update
@@ -1,13 +1,33 @@
 import logging
 import json
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from config import config
 from database import QueryBuilder, execute_query
-from validators import RequestValidator, ResponseFormatter, ValidationError
+from validators import RequestValidator, response_success, response_error, response_validation_error
 from cache import cached, rate_limited, cache_stats, clear_cache
 
+# orjson是Rust实现的JSON序列化器，大结果集接口用它直接产出bytes，
+# 比纯Python的json.dumps快数倍；未安装时回退Flask自带jsonify
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 app = Flask(__name__)
 
+
+def json_response(payload, status: int = 200):
+    """序列化JSON响应（优先orjson，default=str兜底datetime/Decimal）"""
+    if orjson is not None:
+        return Response(
+            orjson.dumps(payload, default=str),
+            status=status,
+            mimetype="application/json"
+        )
+    response = jsonify(payload)
+    response.status_code = status
+    return response
+
 # 配置JSON编码，确保中文字符正确显示
 app.json.ensure_ascii = False
 
@@ -29,7 +49,7 @@ if missing_configs:
 @app.route("/", methods=["GET"])
 def health_check():
     """健康检查接口"""
-    return jsonify(ResponseFormatter.success(
+    return jsonify(response_success(
         data={
             "status": "healthy",
             "service": "Stock and Fund API Service",
@@ -65,33 +85,33 @@ def health_check():
 @cached(ttl=300, key_prefix="stock")
 def get_stock_info():
     """股票信息查询接口"""
+    # 参数验证：坏参数走返回值而非异常，公网探测流量下
+    # 不再为每个4xx构造异常和回溯
+    ok, params = RequestValidator.validate_stock_params_fast()
+    if not ok:
+        logger.warning(f"股票查询参数验证失败: {params.message}")
+        return json_response(response_validation_error(params), 400)
+
     try:
-        # 参数验证
-        params = RequestValidator.validate_stock_params()
-        
         # 构建查询
         query, query_params = QueryBuilder.build_stock_query(params)
-        
+
         # 执行查询
         result = execute_query(query, query_params, 'stock')
-        
+
         logger.info(f"股票查询成功，返回 {len(result)} 条记录")
-        return jsonify(ResponseFormatter.success(
+        return json_response(response_success(
             data=result,
             message="股票信息查询成功",
             total=len(result)
         ))
-        
-    except ValidationError as e:
-        logger.warning(f"股票查询参数验证失败: {e.message}")
-        return jsonify(ResponseFormatter.validation_error(e)), 400
-        
+
     except Exception as e:
         logger.error(f"股票查询失败: {str(e)}")
-        return jsonify(ResponseFormatter.error(
+        return json_response(response_error(
             message=f"股票查询失败: {str(e)}",
             code=500
-        )), 500
+        ), 500)
 
 
 @app.route("/fundinfo", methods=["GET"])
@@ -99,33 +119,32 @@ def get_stock_info():
 @cached(ttl=300, key_prefix="fund")
 def get_fund_info():
     """基金信息查询接口"""
+    # 参数验证：同股票接口，坏参数走返回值快路径
+    ok, params = RequestValidator.validate_fund_params_fast()
+    if not ok:
+        logger.warning(f"基金查询参数验证失败: {params.message}")
+        return json_response(response_validation_error(params), 400)
+
     try:
-        # 参数验证
-        params = RequestValidator.validate_fund_params()
-        
         # 构建查询
         query, query_params = QueryBuilder.build_fund_query(params)
-        
+
         # 执行查询
         result = execute_query(query, query_params, 'fund')
-        
+
         logger.info(f"基金查询成功，返回 {len(result)} 条记录")
-        return jsonify(ResponseFormatter.success(
+        return json_response(response_success(
             data=result,
             message="基金信息查询成功",
             total=len(result)
         ))
-        
-    except ValidationError as e:
-        logger.warning(f"基金查询参数验证失败: {e.message}")
-        return jsonify(ResponseFormatter.validation_error(e)), 400
-        
+
     except Exception as e:
         logger.error(f"基金查询失败: {str(e)}")
-        return jsonify(ResponseFormatter.error(
+        return json_response(response_error(
             message=f"基金查询失败: {str(e)}",
             code=500
-        )), 500
+        ), 500)
 
 
 @app.route("/cache/stats", methods=["GET"])
@@ -134,13 +153,13 @@ def get_cache_stats():
     """获取缓存统计信息"""
     try:
         stats = cache_stats()
-        return jsonify(ResponseFormatter.success(
+        return jsonify(response_success(
             data=stats,
             message="缓存统计信息获取成功"
         ))
     except Exception as e:
         logger.error(f"获取缓存统计失败: {str(e)}")
-        return jsonify(ResponseFormatter.error(
+        return jsonify(response_error(
             message=f"获取缓存统计失败: {str(e)}",
             code=500
         )), 500
@@ -152,13 +171,13 @@ def clear_cache_endpoint():
     """清空缓存"""
     try:
         clear_cache()
-        return jsonify(ResponseFormatter.success(
+        return jsonify(response_success(
             data=None,
             message="缓存清空成功"
         ))
     except Exception as e:
         logger.error(f"清空缓存失败: {str(e)}")
-        return jsonify(ResponseFormatter.error(
+        return jsonify(response_error(
             message=f"清空缓存失败: {str(e)}",
             code=500
         )), 500
@@ -168,7 +187,7 @@ def clear_cache_endpoint():
 @app.errorhandler(404)
 def not_found(error):
     """404错误处理"""
-    return jsonify(ResponseFormatter.error(
+    return jsonify(response_error(
         message="请求的资源不存在",
         code=404
     )), 404
@@ -176,7 +195,7 @@ def not_found(error):
 @app.errorhandler(405)
 def method_not_allowed(error):
     """405错误处理"""
-    return jsonify(ResponseFormatter.error(
+    return jsonify(response_error(
         message="请求方法不被允许",
         code=405
     )), 405
@@ -185,7 +204,7 @@ def method_not_allowed(error):
 def internal_error(error):
     """500错误处理"""
     logger.error(f"内部服务器错误: {str(error)}")
-    return jsonify(ResponseFormatter.error(
+    return jsonify(response_error(
         message="内部服务器错误",
         code=500
     )), 500
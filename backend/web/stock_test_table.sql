@@ -35,6 +35,12 @@ CREATE TABLE public.stock_test (
 	CONSTRAINT unique_test_symbol_market UNIQUE (symbol, market)
 );
 
+-- Indexes
+-- varchar_pattern_ops让左锚定的LIKE 'foo%'（/stockinfo的name筛选）
+-- 走索引范围扫描而非全表顺序扫描
+CREATE INDEX idx_stock_test_cname_pattern ON public.stock_test (cname varchar_pattern_ops);
+CREATE INDEX idx_stock_test_name_pattern ON public.stock_test ("name" varchar_pattern_ops);
+
 -- Table Triggers
 
 create trigger trg_test_update_time before